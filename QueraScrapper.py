@@ -3,25 +3,75 @@
 # Scrape → Classify → Upload to GitHub
 # ========================================
 
+from __future__ import annotations
+
 import os
+import re
+import sys
 import time
 import json
+import hashlib
+import argparse
+import zlib
 import pickle
+import sqlite3
 import logging
 import random
+import heapq
+import queue
 import shutil
+import threading
 import subprocess
-from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, Set
 from pathlib import Path
+from urllib.parse import urljoin, urlparse
+import importlib
+
+# ==================== LAZY IMPORTS ====================
+
+class _LazyImport:
+    """Module (or one of its attributes) imported on first use.
+
+    Selenium, OpenAI, numpy, requests and bs4 take about a second to import;
+    a ``classify`` or ``upload`` run that never touches a browser should not
+    pay for them.
+    """
+    
+    def __init__(self, module: str, attr: Optional[str] = None):
+        self._module = module
+        self._attr = attr
+        self._target = None
+    
+    def _resolve(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            self._target = getattr(target, self._attr) if self._attr else target
+        return self._target
+    
+    def __getattr__(self, name: str):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self._resolve(), name)
+    
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+np = _LazyImport("numpy")
+
+webdriver = _LazyImport("selenium.webdriver")
+By = _LazyImport("selenium.webdriver.common.by", "By")
+Keys = _LazyImport("selenium.webdriver.common.keys", "Keys")
+WebDriverWait = _LazyImport("selenium.webdriver.support.ui", "WebDriverWait")
+EC = _LazyImport("selenium.webdriver.support.expected_conditions")
+selenium_errors = _LazyImport("selenium.common.exceptions")
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+requests = _LazyImport("requests")
+HTTPAdapter = _LazyImport("requests.adapters", "HTTPAdapter")
+BeautifulSoup = _LazyImport("bs4", "BeautifulSoup")
 
-from openai import OpenAI
+openai = _LazyImport("openai")
 
 # ==================== LOGGING SETUP ====================
 logging.basicConfig(
@@ -37,6 +87,7 @@ QUERA_PASSWORD = "YourPass"
 
 # OpenRouter API
 OPENROUTER_API_KEY = "sk-or-v..."
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 
 # GitHub Configuration
 GITHUB_USERNAME = "VictimPickle"
@@ -45,6 +96,53 @@ GITHUB_REPO_NAME = "Problems-solved"
 # Paths
 BASE_DIR = "quera_questions"
 ORGANIZED_DIR = "organized_problems"
+MANIFEST_FILE = "scrape_manifest.json"
+JOURNAL_FILE = "scrape_journal.jsonl"
+LISTING_FILE = "listing_index.json"
+ASSETS_DIR = "_assets"
+SOURCES_FILE = ".sources.json"  # scraped folders an organized problem folder was made from
+CHROME_PROFILE_DIR = "chrome_profile"
+
+AI_CACHE_FILE = "ai_cache.sqlite3"
+PROBLEM_STORE_FILE = "problems.sqlite3"
+SEARCH_INDEX_FILE = "search_index.sqlite3"
+
+# LLM settings
+AI_MODEL = "openai/gpt-3.5-turbo"
+AI_TEMPERATURE = 0.3
+STATEMENT_PROMPT_CHARS = 2000  # statement characters sent to the LLM
+BATCH_SECTION_RE = re.compile(r"^=== PROBLEM (\S+) ===[ \t]*$", re.M)  # heads each answer of a batch
+LOCAL_LABEL_MARKER = "Classified offline by the local model"  # README note of labels not from the LLM
+
+# Run metrics are written to <prefix>.json and <prefix>.prom
+METRICS_PREFIX = "run_metrics"
+
+# Politeness budget used when fetching concurrently
+DEFAULT_REQUESTS_PER_MINUTE = 8
+RATE_LIMIT_MARKER = "به کجا چنین شتابان"
+
+# Headings that introduce sample input/output blocks in a statement
+SAMPLE_INPUT_RE = re.compile(r"ورودی\s*(نمونه|مثال)|sample\s*input", re.I)
+SAMPLE_OUTPUT_RE = re.compile(r"خروجی\s*(نمونه|مثال)|sample\s*output", re.I)
+
+# Linked files downloaded along with a problem (images are always downloaded)
+ATTACHMENT_EXTENSIONS = (".zip", ".pdf", ".txt", ".in", ".out", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+
+# Requests Chrome drops in the "lean" profile (Network.setBlockedURLs wildcards)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*hotjar.com*", "*clarity.ms*", "*sentry.io*", "*yektanet.com*", "*najva.com*", "*goftino.com*",
+]
+
+# Text in an assignment's own deadline/status element once it no longer accepts submissions
+CLOSED_MARKERS = ("پایان یافته", "به پایان رسیده", "مهلت ارسال تمام شده")
+ASSIGNMENT_STATUS_SELECTOR = "[class*='deadline'], [class*='countdown'], [class*='status'], time"
+
+# How long listings stay valid, in hours (closed assignments never expire)
+LISTING_TTL_HOURS = {"courses": 6.0, "assignments": 24.0, "problems": 24.0}
 
 # Categories for classification
 CATEGORIES = {
@@ -60,31 +158,155 @@ CATEGORIES = {
     "10_Geometric_Mathematical": "الگوریتم‌های هندسی و ریاضی"
 }
 
+# ==================== METRICS ====================
+
+class Metrics:
+    """Thread-safe timing spans and counters for one run.
+
+    Spans named in ``SLEEP_SPANS`` count as idle time in the sleep-vs-work
+    breakdown; everything else is work. Sleep is summed over threads, so
+    ``sleep_ratio`` compares it with worker-seconds (each thread's time from
+    its first to its last span), not with wall time.
+    """
+    SLEEP_SPANS = ("rate_limit_wait", "retry_backoff")
+    
+    def __init__(self, progress_every: float = 60.0):
+        self.durations: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.progress_every = progress_every
+        self.started = time.monotonic()
+        self._last_progress = self.started
+        self._active: Dict[int, tuple] = {}  # thread -> (first span start, last span end)
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+    
+    def observe(self, name: str, seconds: float):
+        end = time.perf_counter()
+        thread = threading.get_ident()
+        with self._lock:
+            self.durations.setdefault(name, []).append(seconds)
+            first, _ = self._active.get(thread, (end - seconds, end))
+            self._active[thread] = (min(first, end - seconds), end)
+        self.log_progress()
+    
+    def incr(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    @staticmethod
+    def _percentile(values: List[float], q: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+    
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            durations = {name: list(values) for name, values in self.durations.items()}
+            counters = dict(self.counters)
+            worker = sum(last - first for first, last in self._active.values())
+        wall = time.monotonic() - self.started
+        spans = {name: {
+            "count": len(values),
+            "total": sum(values),
+            "p50": self._percentile(values, 0.50),
+            "p95": self._percentile(values, 0.95),
+            "p99": self._percentile(values, 0.99),
+            "max": max(values),
+        } for name, values in sorted(durations.items())}
+        sleep = sum(spans[name]["total"] for name in self.SLEEP_SPANS if name in spans)
+        return {
+            "wall_seconds": wall,
+            "worker_seconds": worker,
+            "sleep_seconds": sleep,
+            "sleep_ratio": sleep / worker if worker else 0.0,
+            "spans": spans,
+            "counters": counters,
+        }
+    
+    def log_progress(self, force: bool = False):
+        """Log a one-line summary at most every ``progress_every`` seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_progress < self.progress_every:
+                return
+            self._last_progress = now
+            counters = dict(self.counters)
+        wall = now - self.started
+        logger.info(f"📈 {wall / 60:.1f} min | pages {counters.get('pages', 0):.0f} | "
+                    f"problems {counters.get('problems_saved', 0):.0f} | "
+                    f"classified {counters.get('problems_classified', 0):.0f} | "
+                    f"rate limits {counters.get('rate_limit_hits', 0):.0f} | "
+                    f"tokens {counters.get('llm_tokens', 0):.0f}")
+    
+    def export(self, prefix: str = METRICS_PREFIX):
+        """Write ``<prefix>.json`` and a Prometheus text file ``<prefix>.prom``"""
+        summary = self.summary()
+        with open(f"{prefix}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        
+        lines = ["# TYPE quera_span_seconds summary"]
+        for name, span in summary["spans"].items():
+            for q in ("p50", "p95", "p99"):
+                lines.append(f'quera_span_seconds{{span="{name}",quantile="0.{q[1:]}"}} {span[q]:.6f}')
+            lines.append(f'quera_span_seconds_sum{{span="{name}"}} {span["total"]:.6f}')
+            lines.append(f'quera_span_seconds_count{{span="{name}"}} {span["count"]}')
+        lines.append("# TYPE quera_events_total counter")
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f'quera_events_total{{event="{name}"}} {value:g}')
+        lines.append("# TYPE quera_run_seconds gauge")
+        lines.append(f'quera_run_seconds{{kind="wall"}} {summary["wall_seconds"]:.3f}')
+        lines.append(f'quera_run_seconds{{kind="worker"}} {summary["worker_seconds"]:.3f}')
+        lines.append(f'quera_run_seconds{{kind="sleep"}} {summary["sleep_seconds"]:.3f}')
+        with open(f"{prefix}.prom", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        
+        logger.info(f"📈 Metrics: {prefix}.json, {prefix}.prom "
+                    f"(slept {summary['sleep_ratio']:.0%} of {summary['worker_seconds']:.0f} worker-seconds, "
+                    f"{summary['wall_seconds']:.0f}s wall)")
+
+METRICS = Metrics()
+
+def timed(name: str):
+    """Decorator recording each call as a ``METRICS`` span"""
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            with METRICS.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 # ==================== UTILITY FUNCTIONS ====================
 
 def retry(tries=3, delay=1.0, backoff=2.0, exceptions=(Exception,)):
-    """Retry decorator for functions"""
+    """Retry decorator for functions.
+    
+    ``exceptions`` may also be a function returning the tuple, so it can name
+    exceptions of lazily imported modules.
+    """
     def decorator(func):
         def wrapper(*args, **kwargs):
             _tries, _delay = tries, delay
+            caught = exceptions if isinstance(exceptions, tuple) else exceptions()
             for attempt in range(_tries):
                 try:
                     return func(*args, **kwargs)
-                except exceptions as e:
+                except caught as e:
                     if attempt == _tries - 1:
                         raise
                     logger.warning(f"{func.__name__}: retry {attempt+1}/{tries} after {_delay:.1f}s")
-                    time.sleep(_delay)
+                    METRICS.incr("retries")
+                    with METRICS.span("retry_backoff"):
+                        time.sleep(_delay)
                     _delay *= backoff
         return wrapper
     return decorator
 
-def human_sleep(min_s: float = 5.0, max_s: float = 10.0):
-    """Random sleep to mimic human behavior"""
-    t = random.uniform(min_s, max_s)
-    logger.info(f"⏳ Sleeping {t:.1f}s...")
-    time.sleep(t)
-
 def safe_filename(name: str) -> str:
     """Make filename safe for filesystem"""
     name = name.strip().replace(" ", "_")
@@ -92,25 +314,1184 @@ def safe_filename(name: str) -> str:
         name = name.replace(ch, "")
     return name or "untitled"
 
+_PERSIAN_CHAR_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ك": "ک", "ة": "ه", "أ": "ا", "إ": "ا", "ؤ": "و",
+    "\u200c": " ", "\u200f": "", "\u200e": "", "\u0640": "",
+    **{chr(c): "" for c in range(0x064B, 0x0653)},  # harakat
+    **{d: str(i) for i, d in enumerate("۰۱۲۳۴۵۶۷۸۹")},
+    **{d: str(i) for i, d in enumerate("٠١٢٣٤٥٦٧٨٩")},
+})
+
+def normalize_text(text: str) -> str:
+    """Unify Persian/Arabic letters and digits, lowercase and collapse whitespace"""
+    return " ".join(text.translate(_PERSIAN_CHAR_MAP).lower().split())
+
+def atomic_write_text(path: str, text: str):
+    """Write a file via temp file + rename so a crash never leaves it truncated"""
+    tmp = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def read_statement(path: Path, limit: Optional[int] = STATEMENT_PROMPT_CHARS) -> str:
+    """First ``limit`` characters of a statement file (all of it if ``limit`` is None)"""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read(-1 if limit is None else limit)
+
+def file_hash(path: Path) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone via the Linux FICLONE ioctl (btrfs, XFS, ...)"""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    FICLONE = 0x40049409
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        if dst.exists():
+            dst.unlink()
+        return False
+
+def place_file(src: Path, dst: Path, mode: str = "copy") -> str:
+    """Put ``src`` at ``dst`` unless an identical file is already there.
+
+    ``mode="link"`` tries a reflink, then a hardlink, then falls back to a
+    copy. Returns what was done: skipped, reflinked, linked or copied.
+    """
+    if dst.exists():
+        src_stat, dst_stat = src.stat(), dst.stat()
+        if (src_stat.st_ino, src_stat.st_dev) == (dst_stat.st_ino, dst_stat.st_dev):
+            return "skipped"
+        if src_stat.st_size == dst_stat.st_size and (
+                int(src_stat.st_mtime) == int(dst_stat.st_mtime) or file_hash(src) == file_hash(dst)):
+            return "skipped"
+        dst.unlink()
+    if mode == "link":
+        if _reflink(src, dst):
+            return "reflinked"
+        try:
+            os.link(src, dst)
+            return "linked"
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+    return "copied"
+
+_RELOCATE_LOCK = threading.Lock()
+_SOURCE_FOLDERS: Dict[str, Dict[str, Path]] = {}  # organized tree -> {source: problem folder}
+
+def _source_folders(output_path: Path) -> Dict[str, Path]:
+    """Index of an organized tree by recorded source, read from disk once per process"""
+    key = str(Path(output_path).resolve())
+    if key not in _SOURCE_FOLDERS:
+        _SOURCE_FOLDERS[key] = {source: folder for source, (folder, _) in organized_sources(output_path).items()}
+    return _SOURCE_FOLDERS[key]
+
+def relocate_problem_folder(output_path: Path, category: str, folder_name: str, source: str) -> Path:
+    """Return the folder in ``category`` of the problem from ``source``, moving it there if needed.
+    
+    Folders are found by the sources recorded in their ``SOURCES_FILE``, so
+    same-titled problems from different sources get numbered folders
+    (``name (2)``, ...) instead of replacing each other. An unrecorded
+    folder of the same name (organized before sources were kept) is adopted.
+    """
+    with _RELOCATE_LOCK:
+        index = _source_folders(output_path)
+        current = index.get(source)
+        owned = current is not None and source in read_problem_sources(current)
+        if not owned:
+            current = None
+            for other in list(CATEGORIES) + ["00_Uncategorized"]:
+                folder = output_path / other / folder_name
+                if folder.is_dir() and not read_problem_sources(folder) and (current is None or other == category):
+                    current = folder
+        if current is None or current.parent.name != category:
+            target, n = output_path / category / folder_name, 2
+            while target.exists():
+                target, n = output_path / category / f"{folder_name} ({n})", n + 1
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if current:
+                logger.info(f"   🔀 Moving {folder_name}: {current.parent.name} → {category}")
+                current.rename(target)
+            else:
+                target.mkdir()
+            current = target
+        if owned:
+            for other in read_problem_sources(current):
+                index[other] = current
+        else:
+            # Claim the folder until the caller records the statement hash
+            write_problem_sources(current, {source: ""})
+        return current
+
+def read_problem_sources(problem_folder: Path) -> Dict[str, str]:
+    """Sources recorded for an organized problem folder, mapped to their statement hashes"""
+    try:
+        with open(problem_folder / SOURCES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f).get("sources", {})
+    except (OSError, ValueError):
+        return {}
+
+def write_problem_sources(problem_folder: Path, sources: Dict[str, str]):
+    """Record the sources (scraped folders or store keys) of an organized problem and their statement hashes"""
+    atomic_write_text(str(problem_folder / SOURCES_FILE), json.dumps({"sources": sources}, indent=1))
+    index = _SOURCE_FOLDERS.get(str(problem_folder.parent.parent.resolve()))
+    if index is not None:
+        index.update(dict.fromkeys(sources, problem_folder))
+
+def organized_sources(output_path: Path) -> Dict[str, tuple]:
+    """Map each recorded source to its (organized folder, statement hash)"""
+    sources = {}
+    for marker in Path(output_path).glob(f"*/*/{SOURCES_FILE}"):
+        for source, digest in read_problem_sources(marker.parent).items():
+            sources[source] = (marker.parent, digest)
+    return sources
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def process_tree_rss_mb(pid: int) -> float:
+    """Resident memory of a process and all its descendants (Linux /proc, 0 elsewhere)"""
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    page_kb = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21]) * page_kb
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total / 1024
+
+# ==================== CHECKPOINT JOURNAL ====================
+
+class CheckpointJournal:
+    """Append-only record of completed courses, assignments and problems.
+
+    Every entry is one JSON line, flushed and fsynced before returning, so
+    a crash loses at most the item in progress. A torn last line is ignored
+    on load. Without ``resume`` the journal starts empty. Extra fields given
+    to ``mark`` are kept in ``records`` for rebuilding the manifest.
+    """
+    
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.completed: set = set()
+        self.records: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._torn = False
+        if resume:
+            self._load()
+            logger.info(f"♻️ Resuming: {len(self.completed)} completed items in journal")
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if self._torn:
+            # Start after a line cut off by a crash
+            self._file.write("\n")
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._torn = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                    self.completed.add(record["key"])
+                except (ValueError, KeyError):
+                    continue
+                self.records[record["key"]] = record
+    
+    def mark(self, key: str, **data: Any):
+        with self._lock:
+            if key in self.completed:
+                return
+            self.completed.add(key)
+            record = {"key": key, "at": time.time(), **data}
+            self.records[key] = record
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.completed
+    
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+# ==================== SCRAPE MANIFEST ====================
+
+class ScrapeManifest:
+    """Persistent record of fetched courses, assignments and problems.
+
+    Problems are keyed by course id, assignment id and ``data-pid``. Entries
+    older than ``refresh_older_than`` hours are re-fetched; ``None`` keeps
+    them forever and ``0`` re-fetches everything. Items in the checkpoint
+    ``journal`` count as done regardless of age. With a ``store`` the
+    statements live in the store instead of ``statement.txt`` files.
+    
+    Recorded problems are written to the file at most every
+    ``SAVE_INTERVAL`` seconds and whenever an assignment or course is
+    recorded; problems recorded since are rebuilt from the journal.
+    """
+    SAVE_INTERVAL = 30.0
+    
+    def __init__(self, path: str, refresh_older_than: Optional[float] = None,
+                 journal: Optional[CheckpointJournal] = None, store: Optional["ProblemStore"] = None):
+        self.path = path
+        self.journal = journal
+        self.store = store
+        self.max_age = None if refresh_older_than is None else refresh_older_than * 3600
+        self.data: Dict[str, Dict[str, Dict]] = {"courses": {}, "assignments": {}, "problems": {}}
+        self._lock = threading.RLock()
+        self._saved_at = time.monotonic()
+        self._load()
+        if journal is not None:
+            self._replay(journal)
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+            for section in self.data:
+                self.data[section].update(loaded.get(section, {}))
+            logger.info(f"📒 Manifest loaded: {len(self.data['problems'])} problems")
+        except Exception as e:
+            logger.warning(f"Manifest load error: {e}")
+    
+    def _replay(self, journal: CheckpointJournal):
+        """Restore problems journaled after the manifest file was last saved"""
+        replayed = 0
+        for key, record in journal.records.items():
+            kind, _, key = key.partition(":")
+            if kind != "problem" or "hash" not in record:
+                continue
+            entry = self.data["problems"].get(key, {})
+            if entry.get("hash") == record["hash"] or entry.get("fetched_at", 0) >= record["at"]:
+                continue
+            self.data["problems"][key] = {"path": record["path"], "hash": record["hash"],
+                                          "fetched_at": record["at"]}
+            replayed += 1
+        if replayed:
+            logger.info(f"📒 {replayed} problems restored from the journal")
+    
+    def save(self):
+        try:
+            with self._lock:
+                atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=1))
+                self._saved_at = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Manifest save error: {e}")
+    
+    @staticmethod
+    def problem_key(course_id: str, assignment_id: str, problem_id: str) -> str:
+        return f"{course_id}/{assignment_id}/{problem_id}"
+    
+    @staticmethod
+    def assignment_key(course_id: str, assignment_id: str) -> str:
+        return f"{course_id}/{assignment_id}"
+    
+    def _is_fresh(self, entry: Optional[Dict]) -> bool:
+        if not entry:
+            return False
+        if self.max_age is None:
+            return True
+        return time.time() - entry.get("fetched_at", 0) < self.max_age
+    
+    def _journaled(self, kind: str, key: str) -> bool:
+        return self.journal is not None and f"{kind}:{key}" in self.journal
+    
+    def _mark(self, kind: str, key: str, **data: Any):
+        if self.journal is not None:
+            self.journal.mark(f"{kind}:{key}", **data)
+    
+    def problem_done(self, course_id: str, assignment_id: str, problem_id: str) -> bool:
+        key = self.problem_key(course_id, assignment_id, problem_id)
+        entry = self.data["problems"].get(key)
+        if not (self._is_fresh(entry) or (entry and self._journaled("problem", key))):
+            return False
+        if self.store:
+            return self.store.has(course_id, assignment_id, problem_id)
+        return os.path.exists(os.path.join(entry["path"], "statement.txt"))
+    
+    def problems_done(self, course_id: str, assignment_id: str, problem_ids: List[str]) -> bool:
+        """True if every listed problem of an assignment is done"""
+        return bool(problem_ids) and all(
+            self.problem_done(course_id, assignment_id, pid) for pid in problem_ids)
+    
+    def record_problem(self, course_id: str, assignment_id: str, problem_id: str,
+                       problem_dir: str, content: str) -> bool:
+        """Record a fetched problem, returns True if its content changed"""
+        key = self.problem_key(course_id, assignment_id, problem_id)
+        digest = content_hash(content)
+        with self._lock:
+            previous = self.data["problems"].get(key, {}).get("hash")
+            self.data["problems"][key] = {
+                "path": problem_dir,
+                "hash": digest,
+                "fetched_at": time.time(),
+            }
+            if time.monotonic() - self._saved_at >= self.SAVE_INTERVAL:
+                self.save()
+        self._mark("problem", key, path=problem_dir, hash=digest)
+        return previous != digest
+    
+    def record_assignment(self, course_id: str, assignment_id: str, problem_ids: List[str]):
+        with self._lock:
+            self.data["assignments"][self.assignment_key(course_id, assignment_id)] = {
+                "problems": problem_ids,
+                "fetched_at": time.time(),
+            }
+            self.save()
+        self._mark("assignment", self.assignment_key(course_id, assignment_id))
+    
+    def record_course(self, course_id: str, assignment_ids: List[str]):
+        with self._lock:
+            self.data["courses"][course_id] = {
+                "assignments": assignment_ids,
+                "fetched_at": time.time(),
+            }
+            self.save()
+        self._mark("course", course_id)
+
+# ==================== LISTING INDEX ====================
+
+class ListingIndex:
+    """Persisted course, assignment and problem listings with a TTL per level.
+
+    Levels are ``courses`` (one entry), ``assignments`` (per course id) and
+    ``problems`` (per course/assignment key). Problem listings of closed
+    assignments never expire.
+    """
+    
+    def __init__(self, path: str, ttl_hours: Optional[Dict[str, Optional[float]]] = None):
+        self.path = path
+        self.ttl = dict(LISTING_TTL_HOURS, **(ttl_hours or {}))
+        self.data: Dict[str, Dict[str, Dict]] = {level: {} for level in LISTING_TTL_HOURS}
+        self._lock = threading.RLock()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for level, entries in json.load(f).items():
+                        self.data.setdefault(level, {}).update(entries)
+            except Exception as e:
+                logger.warning(f"Listing index load error: {e}")
+    
+    def peek(self, level: str, key: str = "") -> Optional[Dict]:
+        """Stored entry (items, closed, fetched_at, changed_at) even if expired"""
+        with self._lock:
+            entry = self.data[level].get(key)
+        return dict(entry) if entry else None
+    
+    def get(self, level: str, key: str = "") -> Optional[List[Dict]]:
+        """Cached listing, or None if missing or expired"""
+        with self._lock:
+            entry = self.data[level].get(key)
+        if not entry:
+            return None
+        ttl = self.ttl.get(level)
+        if entry.get("closed") or ttl is None or time.time() - entry["fetched_at"] < ttl * 3600:
+            return [dict(item) for item in entry["items"]]
+        return None
+    
+    def put(self, level: str, key: str, items: List[Dict], closed: bool = False) -> bool:
+        """Store a fresh listing, returns True if it differs from the previous one"""
+        digest = content_hash(json.dumps(items, sort_keys=True, ensure_ascii=False))
+        with self._lock:
+            previous = self.data[level].get(key, {})
+            changed = previous.get("hash") != digest
+            self.data[level][key] = {
+                "items": items,
+                "hash": digest,
+                "closed": closed,
+                "fetched_at": time.time(),
+                "changed_at": time.time() if changed else previous.get("changed_at", time.time()),
+            }
+            try:
+                atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=1))
+            except Exception as e:
+                logger.warning(f"Listing index save error: {e}")
+        return changed
+
+# ==================== SCRAPE SCHEDULER ====================
+
+class ScrapeScheduler:
+    """Priority queue of scrape work under an optional request/time budget.
+
+    Lower priorities are popped first and equal ones in insertion order.
+    Every page request is ``charge``d; once ``max_requests`` or
+    ``max_seconds`` is spent, ``pop`` returns None and the remaining work is
+    left for the next run.
+    """
+    # Priority tiers of an assignment
+    NEW, CHANGED, STALE, CLOSED = range(4)
+    
+    def __init__(self, max_requests: Optional[int] = None, max_seconds: Optional[float] = None):
+        self.max_requests = max_requests
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+        self.requests = 0
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._lock = threading.Lock()
+    
+    def push(self, priority: tuple, item: Any):
+        with self._lock:
+            heapq.heappush(self._heap, (priority, self._seq, item))
+            self._seq += 1
+    
+    def pop(self) -> Optional[Any]:
+        """Most urgent item, or None when empty or out of budget"""
+        with self._lock:
+            if not self._heap or not self._budget_left():
+                return None
+            return heapq.heappop(self._heap)[2]
+    
+    def charge(self, requests: int = 1):
+        with self._lock:
+            self.requests += requests
+    
+    def _budget_left(self) -> bool:
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return False
+        return self.deadline is None or time.monotonic() < self.deadline
+    
+    def budget_left(self) -> bool:
+        with self._lock:
+            return self._budget_left()
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+
+# ==================== PROBLEM STORE ====================
+
+class ProblemStore:
+    """Single-file SQLite index of every scraped problem.
+
+    Holds ids, names, statement, samples and assets (``extras``), category,
+    summary and hashes, written incrementally by the scraper and the
+    classifier. With a store the scraper writes no problem folders; the
+    organized tree is an export of this store (see ``export_tree``).
+    """
+    COLUMNS = ("course_id", "assignment_id", "problem_id", "course_name", "assignment_name",
+               "title", "folder", "statement", "statement_hash", "scraped_at",
+               "category", "summary", "classified_hash", "classified_at", "extras", "exported_hash")
+    EXPORT_HASH = "export_hash(category, folder, summary, statement_hash, extras)"
+    
+    def __init__(self, path: str = PROBLEM_STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.create_function("export_hash", 5, self._export_hash, deterministic=True)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS problems ("
+            " course_id TEXT NOT NULL, assignment_id TEXT NOT NULL, problem_id TEXT NOT NULL,"
+            " course_name TEXT, assignment_name TEXT, title TEXT, folder TEXT,"
+            " statement TEXT, statement_hash TEXT, scraped_at REAL,"
+            " category TEXT, summary TEXT, classified_hash TEXT, classified_at REAL,"
+            " PRIMARY KEY (course_id, assignment_id, problem_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS problems_category ON problems (category)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS problems_hash ON problems (statement_hash)")
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(problems)")}
+        for column in ("extras", "exported_hash"):
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE problems ADD COLUMN {column} TEXT")
+        self.conn.commit()
+    
+    def upsert_statement(self, course_id: str, assignment_id: str, problem_id: str,
+                         course_name: str, assignment_name: str, title: str, folder: str,
+                         statement: str, extras: Optional[Dict] = None):
+        """Insert or update a scraped problem; ``extras`` holds its samples and asset URLs"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO problems (course_id, assignment_id, problem_id, course_name,"
+                " assignment_name, title, folder, statement, statement_hash, scraped_at, extras)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (course_id, assignment_id, problem_id) DO UPDATE SET"
+                " course_name = excluded.course_name, assignment_name = excluded.assignment_name,"
+                " title = excluded.title, folder = excluded.folder, statement = excluded.statement,"
+                " statement_hash = excluded.statement_hash, scraped_at = excluded.scraped_at,"
+                " extras = excluded.extras",
+                (course_id, assignment_id, problem_id, course_name, assignment_name, title, folder,
+                 statement, content_hash(statement), time.time(),
+                 json.dumps(extras, ensure_ascii=False) if extras else None)
+            )
+            self.conn.commit()
+    
+    def set_classification(self, course_id: str, assignment_id: str, problem_id: str,
+                           category: str, summary: str, statement_hash: str):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE problems SET category = ?, summary = ?, classified_hash = ?, classified_at = ?"
+                " WHERE course_id = ? AND assignment_id = ? AND problem_id = ?",
+                (category, summary, statement_hash, time.time(), course_id, assignment_id, problem_id)
+            )
+            self.conn.commit()
+    
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+    
+    def get(self, course_id: str, assignment_id: str, problem_id: str) -> Optional[sqlite3.Row]:
+        rows = self._query("SELECT * FROM problems WHERE course_id = ? AND assignment_id = ?"
+                           " AND problem_id = ?", (course_id, assignment_id, problem_id))
+        return rows[0] if rows else None
+    
+    def has(self, course_id: str, assignment_id: str, problem_id: str) -> bool:
+        return bool(self._query("SELECT 1 FROM problems WHERE course_id = ? AND assignment_id = ?"
+                                " AND problem_id = ?", (course_id, assignment_id, problem_id)))
+    
+    def pending_classification(self) -> List[sqlite3.Row]:
+        """Problems never classified or whose statement changed since"""
+        return self._query("SELECT * FROM problems WHERE classified_hash IS NULL"
+                           " OR classified_hash != statement_hash")
+    
+    def by_category(self, category: str) -> List[sqlite3.Row]:
+        return self._query("SELECT * FROM problems WHERE category = ?", (category,))
+    
+    def reclassify(self, category: Optional[str] = None) -> int:
+        """Mark problems (all, or one category) for classification again"""
+        with self._lock:
+            if category:
+                cursor = self.conn.execute("UPDATE problems SET classified_hash = NULL WHERE category = ?",
+                                           (category,))
+            else:
+                cursor = self.conn.execute("UPDATE problems SET classified_hash = NULL")
+            self.conn.commit()
+            return cursor.rowcount
+    
+    def counts(self) -> Dict[str, int]:
+        return {row[0] or "unclassified": row[1] for row in
+                self._query("SELECT category, COUNT(*) FROM problems GROUP BY category")}
+    
+    def import_scraped(self, base_dir: str) -> int:
+        """Load statements already on disk, using the scrape manifest for their ids"""
+        manifest = ScrapeManifest(os.path.join(base_dir, MANIFEST_FILE))
+        imported = 0
+        for key, entry in manifest.data["problems"].items():
+            statement_path = Path(entry["path"]) / "statement.txt"
+            if not statement_path.exists():
+                continue
+            course_id, assignment_id, problem_id = key.split("/")
+            problem_dir = Path(entry["path"])
+            statement = statement_path.read_text(encoding="utf-8")
+            self.upsert_statement(course_id, assignment_id, problem_id,
+                                  problem_dir.parent.parent.name.split("_", 1)[-1],
+                                  problem_dir.parent.name.split("_", 1)[-1],
+                                  statement.split("\n", 1)[0], problem_dir.name, statement)
+            imported += 1
+        logger.info(f"📥 Imported {imported} problems into {self.path}")
+        return imported
+    
+    @staticmethod
+    def _export_hash(*values: Optional[str]) -> str:
+        return content_hash("\0".join(value or "" for value in values))
+    
+    def export_tree(self, output_path: str, assets_dir: Optional[str] = None) -> int:
+        """Write ``<category>/<problem>/{statement.txt,README.md,samples,assets}``.
+        
+        Only problems whose category, summary, statement or extras changed
+        since their last export are written; they are picked out in SQL, so
+        unchanged rows are never loaded and the files on disk are not read
+        back. Everything is written again if ``output_path`` is missing.
+        Assets are linked from the downloader's store in ``assets_dir``.
+        """
+        output_path = Path(output_path)
+        force = not output_path.is_dir()
+        asset_urls: Dict[str, str] = {}
+        if assets_dir and os.path.exists(os.path.join(assets_dir, "urls.json")):
+            with open(os.path.join(assets_dir, "urls.json"), "r", encoding="utf-8") as f:
+                asset_urls = json.load(f)
+        written = 0
+        exported = []
+        changed = "" if force else f" AND exported_hash IS NOT {self.EXPORT_HASH}"
+        for row in self._query(f"SELECT *, {self.EXPORT_HASH} AS digest FROM problems"
+                               f" WHERE category IS NOT NULL{changed}"):
+            digest = row["digest"]
+            key = ScrapeManifest.problem_key(row["course_id"], row["assignment_id"], row["problem_id"])
+            problem_folder = relocate_problem_folder(output_path, row["category"], row["folder"], key)
+            atomic_write_text(str(problem_folder / "statement.txt"), row["statement"])
+            atomic_write_text(str(problem_folder / "README.md"), f"# {row['folder']}\n\n{row['summary']}")
+            extras = json.loads(row["extras"]) if row["extras"] else {}
+            for i, (sample_in, sample_out) in enumerate(extras.get("samples", []), 1):
+                sample_dir = problem_folder / "samples" / str(i)
+                sample_dir.mkdir(parents=True, exist_ok=True)
+                atomic_write_text(str(sample_dir / "input.txt"), sample_in)
+                atomic_write_text(str(sample_dir / "output.txt"), sample_out)
+            for name, url in extras.get("assets", {}).items():
+                if url in asset_urls and os.path.exists(os.path.join(assets_dir, asset_urls[url])):
+                    (problem_folder / "assets").mkdir(exist_ok=True)
+                    place_file(Path(assets_dir, asset_urls[url]), problem_folder / "assets" / name, mode="link")
+            write_problem_sources(problem_folder, {key: row["statement_hash"]})
+            exported.append((digest, row["course_id"], row["assignment_id"], row["problem_id"]))
+            written += 1
+        with self._lock:
+            self.conn.executemany("UPDATE problems SET exported_hash = ? WHERE course_id = ?"
+                                  " AND assignment_id = ? AND problem_id = ?", exported)
+            self.conn.commit()
+        logger.info(f"📤 Exported store to {output_path} ({written} problems written)")
+        return written
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+# ==================== SEARCH INDEX ====================
+
+class SearchIndex:
+    """SQLite FTS5 index of the archive for keyword and category lookups.
+
+    Titles, statements and summaries are indexed after ``normalize_text``
+    (Persian/Arabic letters and digits unified, ZWNJ and harakat removed),
+    so "ماشين ۲" finds "ماشین 2". Course, assignment and category are
+    indexed as tag tokens too, so filters are answered by the full-text
+    index instead of scanning rows. Rows are keyed like the manifest and
+    updated by the scraper and the classifier as they write their output.
+    """
+    TEXT_COLUMNS = "{title statement summary}"
+    
+    def __init__(self, path: str = SEARCH_INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id INTEGER PRIMARY KEY, course_id TEXT NOT NULL, assignment_id TEXT NOT NULL,"
+            " problem_id TEXT NOT NULL, course_name TEXT, assignment_name TEXT, title TEXT,"
+            " folder TEXT, path TEXT, category TEXT, summary TEXT, statement_hash TEXT, updated_at REAL,"
+            " UNIQUE (course_id, assignment_id, problem_id))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS docs_path ON docs (path)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS courses (course_id TEXT PRIMARY KEY, course_name TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS assignments (course_id TEXT NOT NULL, assignment_id TEXT NOT NULL,"
+            " assignment_name TEXT, PRIMARY KEY (course_id, assignment_id))")
+        # Filter names are kept normalized so "تمرین 1" matches "تمرين ۱"
+        self.conn.create_function("normalize_text", 1, normalize_text, deterministic=True)
+        self.conn.execute("UPDATE courses SET course_name = normalize_text(course_name)"
+                          " WHERE course_name != normalize_text(course_name)")
+        self.conn.execute("UPDATE assignments SET assignment_name = normalize_text(assignment_name)"
+                          " WHERE assignment_name != normalize_text(assignment_name)")
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5("
+            " title, statement, summary, tags, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        self.conn.execute("INSERT INTO docs_fts (docs_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0, 0.0)')")
+        self.conn.commit()
+    
+    @staticmethod
+    def _path(path) -> str:
+        return os.path.abspath(str(path))
+    
+    @staticmethod
+    def _tag(kind: str, *values: str) -> str:
+        """Single token standing for a course, assignment or category, e.g. ``c18934``"""
+        return kind + "x".join(re.sub(r"[\W_]", "", normalize_text(v)) for v in values)
+    
+    @classmethod
+    def _tags(cls, course_id: str, assignment_id: str, category: Optional[str]) -> str:
+        tags = [cls._tag("c", course_id), cls._tag("a", course_id, assignment_id)]
+        if category:
+            tags.append(cls._tag("k", category))
+        return " ".join(tags)
+    
+    def _index_text(self, doc_id: int, title: str, statement: str, summary: Optional[str], tags: str):
+        self.conn.execute("INSERT INTO docs_fts (rowid, title, statement, summary, tags) VALUES (?, ?, ?, ?, ?)",
+                          (doc_id, normalize_text(title), normalize_text(statement),
+                           normalize_text(summary or ""), tags))
+    
+    def upsert_problem(self, course_id: str, assignment_id: str, problem_id: str,
+                       course_name: str, assignment_name: str, title: str, path: str,
+                       statement: str, commit: bool = True) -> bool:
+        """Index a scraped problem, returns False if it was already indexed unchanged"""
+        digest = content_hash(statement)
+        path = self._path(path)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, statement_hash, path, category, summary FROM docs WHERE course_id = ?"
+                " AND assignment_id = ? AND problem_id = ?", (course_id, assignment_id, problem_id)).fetchone()
+            if row and row["statement_hash"] == digest and row["path"] == path:
+                return False
+            self.conn.execute("INSERT OR REPLACE INTO courses VALUES (?, ?)",
+                              (course_id, normalize_text(course_name)))
+            self.conn.execute("INSERT OR REPLACE INTO assignments VALUES (?, ?, ?)",
+                              (course_id, assignment_id, normalize_text(assignment_name)))
+            values = (course_name, assignment_name, title, os.path.basename(path), path, digest, time.time())
+            if row:
+                doc_id = row["id"]
+                self.conn.execute(
+                    "UPDATE docs SET course_name = ?, assignment_name = ?, title = ?, folder = ?,"
+                    " path = ?, statement_hash = ?, updated_at = ? WHERE id = ?", values + (doc_id,))
+                self.conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = self.conn.execute(
+                    "INSERT INTO docs (course_id, assignment_id, problem_id, course_name, assignment_name,"
+                    " title, folder, path, statement_hash, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (course_id, assignment_id, problem_id) + values).lastrowid
+            self._index_text(doc_id, title, statement, row and row["summary"],
+                             self._tags(course_id, assignment_id, row and row["category"]))
+            if commit:
+                self.conn.commit()
+        return True
+    
+    def set_category(self, category: str, summary: str, path=None, key: Optional[tuple] = None,
+                     commit: bool = True) -> int:
+        """Record a classification by scraped folder ``path`` or (course, assignment, problem) ``key``"""
+        where, params = (("path = ?", (self._path(path),)) if key is None else
+                         ("course_id = ? AND assignment_id = ? AND problem_id = ?", tuple(key)))
+        with self._lock:
+            rows = self.conn.execute(f"SELECT id, course_id, assignment_id FROM docs WHERE {where}",
+                                     params).fetchall()
+            for row in rows:
+                self.conn.execute("UPDATE docs SET category = ?, summary = ?, updated_at = ? WHERE id = ?",
+                                  (category, summary, time.time(), row["id"]))
+                self.conn.execute("UPDATE docs_fts SET summary = ?, tags = ? WHERE rowid = ?",
+                                  (normalize_text(summary),
+                                   self._tags(row["course_id"], row["assignment_id"], category), row["id"]))
+            if commit:
+                self.conn.commit()
+        return len(rows)
+    
+    def _filter_tags(self, course: Optional[str], assignment: Optional[str],
+                     category: Optional[str]) -> Optional[List[str]]:
+        """FTS terms for the filters, each an OR of matching tags; None if a filter matches nothing"""
+        terms = []
+        courses = None
+        if course:
+            courses = [r[0] for r in self.conn.execute(
+                "SELECT course_id FROM courses WHERE course_id = ? OR course_name LIKE ?",
+                (course, f"%{normalize_text(course)}%"))]
+            terms.append([self._tag("c", c) for c in courses])
+        if assignment:
+            rows = self.conn.execute(
+                "SELECT course_id, assignment_id FROM assignments WHERE assignment_id = ?"
+                " OR assignment_name LIKE ?", (assignment, f"%{normalize_text(assignment)}%")).fetchall()
+            terms.append([self._tag("a", c, a) for c, a in rows if courses is None or c in courses])
+        if category:
+            wanted = normalize_text(category)
+            terms.append([self._tag("k", name) for name in list(CATEGORIES) + ["00_Uncategorized"]
+                          if wanted in normalize_text(name) or wanted in normalize_text(CATEGORIES.get(name, ""))])
+        if any(not tags for tags in terms):
+            return None
+        return ["tags : (" + " OR ".join(tags) + ")" for tags in terms]
+    
+    def search(self, keywords: str = "", course: Optional[str] = None, assignment: Optional[str] = None,
+               category: Optional[str] = None, limit: int = 20,
+               rank_candidates: Optional[int] = None) -> List[sqlite3.Row]:
+        """Problems matching every keyword (as a prefix) and the given filters.
+        
+        ``course`` and ``assignment`` match an id or part of a name,
+        ``category`` part of a category name or its description (e.g. "graph").
+        Keyword matches come best (bm25) first; filter-only results newest
+        first. Ranking costs about 2 µs per match, so for very common terms
+        ``rank_candidates`` can bound it to the newest N matches, at the
+        price of never returning older ones.
+        """
+        tokens = re.findall(r"\w+", normalize_text(keywords))
+        with self._lock:
+            terms = self._filter_tags(course, assignment, category)
+            if terms is None:
+                return []
+            terms += [f'{self.TEXT_COLUMNS} : "{token}"*' for token in tokens]
+            if tokens and rank_candidates:
+                ids = [r[0] for r in self.conn.execute(
+                    "SELECT rowid FROM (SELECT rowid, rank FROM docs_fts WHERE docs_fts MATCH ?"
+                    " ORDER BY rowid DESC LIMIT ?) ORDER BY rank LIMIT ?",
+                    (" AND ".join(terms), rank_candidates, limit))]
+            elif tokens:
+                ids = [r[0] for r in self.conn.execute(
+                    "SELECT rowid FROM docs_fts WHERE docs_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (" AND ".join(terms), limit))]
+            elif terms:
+                ids = [r[0] for r in self.conn.execute(
+                    "SELECT rowid FROM docs_fts WHERE docs_fts MATCH ? ORDER BY rowid DESC LIMIT ?",
+                    (" AND ".join(terms), limit))]
+            else:
+                ids = [r[0] for r in self.conn.execute("SELECT id FROM docs ORDER BY id DESC LIMIT ?", (limit,))]
+            rows = {row["id"]: row for row in self.conn.execute(
+                f"SELECT * FROM docs WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        return [rows[i] for i in ids]
+    
+    def rebuild(self, base_dir: str, organized_dir: str) -> int:
+        """Index everything already on disk: the scrape manifest plus organized READMEs"""
+        manifest = ScrapeManifest(os.path.join(base_dir, MANIFEST_FILE))
+        by_folder: Dict[str, List[str]] = {}
+        indexed = 0
+        for key, entry in manifest.data["problems"].items():
+            problem_dir = Path(entry["path"])
+            if not (problem_dir / "statement.txt").exists():
+                continue
+            statement = read_statement(problem_dir / "statement.txt", None)
+            course_id, assignment_id, problem_id = key.split("/")
+            indexed += self.upsert_problem(course_id, assignment_id, problem_id,
+                                           problem_dir.parent.parent.name.split("_", 1)[-1],
+                                           problem_dir.parent.name.split("_", 1)[-1],
+                                           statement.split("\n", 1)[0], str(problem_dir), statement,
+                                           commit=False)
+            by_folder.setdefault(problem_dir.name, []).append(str(problem_dir))
+        
+        for readme in Path(organized_dir).glob("*/*/README.md"):
+            lines = readme.read_text(encoding="utf-8").split("\n")
+            summary = "\n".join(lines[2:]) if lines[0].startswith("# ") else "\n".join(lines)
+            for path in by_folder.get(readme.parent.name, []):
+                self.set_category(readme.parent.parent.name, summary, path=path, commit=False)
+        with self._lock:
+            self.conn.commit()
+        logger.info(f"🔎 Indexed {indexed} new or changed problems into {self.path}")
+        return indexed
+    
+    def export_json(self, path: str) -> int:
+        """Write ``index.json``: one entry per classified problem, with its place in the organized tree"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT course_id, course_name, assignment_id, assignment_name, problem_id, title,"
+                " category, folder FROM docs WHERE category IS NOT NULL"
+                " ORDER BY category, course_id, assignment_id, problem_id").fetchall()
+        entries = [dict(row, path=f"{row['category']}/{row['folder']}") for row in rows]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(path, json.dumps(entries, ensure_ascii=False, indent=1))
+        logger.info(f"🗂️ {path}: {len(entries)} problems")
+        return len(entries)
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+# ==================== RATE LIMITER ====================
+
+class RateLimiter:
+    """Token-bucket rate limit shared by all workers.
+
+    The rate adapts AIMD-style: every success adds ``increase`` requests per
+    minute up to the configured budget, every throttle multiplies it by
+    ``decrease`` and pauses the whole pool for ``cooldown`` seconds.
+    """
+    
+    def __init__(self, requests_per_minute: float, burst: float = 1.0, min_rpm: float = 1.0,
+                 increase: float = 1.0, decrease: float = 0.5, cooldown: float = 90.0):
+        self.max_rpm = requests_per_minute
+        self.rpm = requests_per_minute
+        self.min_rpm = min(min_rpm, requests_per_minute)
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.tokens = burst
+        self.paused_until = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rpm / 60)
+        self._last = now
+    
+    def acquire(self, amount: float = 1.0):
+        """Block until ``amount`` tokens are available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= min(amount, self.burst):
+                    self.tokens -= amount
+                    return
+                else:
+                    delay = (min(amount, self.burst) - self.tokens) * 60 / self.rpm
+            with METRICS.span("rate_limit_wait"):
+                time.sleep(delay)
+    
+    def on_success(self):
+        with self._lock:
+            self.rpm = min(self.max_rpm, self.rpm + self.increase)
+    
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rpm = max(self.min_rpm, self.rpm * self.decrease)
+            self.tokens = 0.0
+            self.paused_until = max(self.paused_until, now + self.cooldown)
+        logger.warning(f"⚠️ Rate limited! Pausing all workers {self.cooldown:.0f}s, "
+                       f"budget now {self.rpm:.1f} req/min")
+
+# ==================== HTTP FETCHER ====================
+
+class HttpFetcher:
+    """Fetch server-rendered pages through a pooled keep-alive session.
+
+    Reuses the cookies pickled by ``QueraScraper.save_cookies`` so pages can
+    be read without driving Chrome.
+    """
+    USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                  "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+    
+    def __init__(self, cookies_file: str, pool_size: int = 8, timeout: float = 30.0):
+        self.cookies_file = cookies_file
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": self.USER_AGENT,
+            "Accept-Language": "fa,en;q=0.8",
+        })
+        self.load_cookies()
+    
+    def load_cookies(self) -> bool:
+        """Copy Selenium cookies into the HTTP session"""
+        if not os.path.exists(self.cookies_file):
+            return False
+        try:
+            with open(self.cookies_file, "rb") as f:
+                for cookie in pickle.load(f):
+                    self.session.cookies.set(
+                        cookie["name"], cookie["value"],
+                        domain=cookie.get("domain", ""), path=cookie.get("path", "/")
+                    )
+            return True
+        except Exception as e:
+            logger.warning(f"HTTP cookie load error: {e}")
+            return False
+    
+    def get(self, url: str) -> Optional[str]:
+        """Return page HTML, or None if the session is not authenticated"""
+        response = self.session.get(url, timeout=self.timeout)
+        if "accounts/login" in response.url:
+            return None
+        response.raise_for_status()
+        return response.text
+    
+    def is_logged_in(self, base_url: str) -> bool:
+        try:
+            return self.get(f"{base_url}/dashboard") is not None
+        except requests.RequestException:
+            return False
+    
+    def close(self):
+        self.session.close()
+
+# ==================== ASSET DOWNLOADER ====================
+
+class AssetDownloader:
+    """Download problem images and attachments in the background.
+
+    Files are stored once under ``<assets_dir>/<sha256[:2]>/<sha256><ext>``
+    and linked into each problem folder, so an image shared by many problems
+    is kept a single time. Downloads run on a small thread pool over the
+    pooled, cookie-carrying ``HttpFetcher`` session; each URL is fetched at
+    most once (also across runs, via ``urls.json``). Files hosted on
+    ``base_url`` go through the scraper's ``limiter``, and HTML answers
+    (login or rate-limit pages) are rejected instead of stored.
+    """
+    
+    def __init__(self, assets_dir: str, cookies_file: str, workers: int = 4, timeout: float = 60.0,
+                 limiter: Optional[RateLimiter] = None, base_url: str = "https://quera.org"):
+        self.assets_dir = Path(assets_dir)
+        self.assets_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.assets_dir / "urls.json"
+        self.fetcher = HttpFetcher(cookies_file, pool_size=workers, timeout=timeout)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="assets")
+        self.urls: Dict[str, str] = {}
+        if self.index_file.exists():
+            try:
+                self.urls = json.loads(self.index_file.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning(f"Asset index load error: {e}")
+        self._downloads: Dict[str, Any] = {}
+        self._pending: List[Any] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.limiter = limiter
+        self.host = urlparse(base_url).netloc
+    
+    def _is_quera_hosted(self, url: str) -> bool:
+        host = urlparse(url).netloc
+        return host == self.host or host.endswith(f".{self.host}")
+    
+    def submit(self, url: str, dst: Optional[Path] = None):
+        """Queue ``url`` to be placed at ``dst``, or only stored (returns immediately)"""
+        with self._lock:
+            download = self._downloads.get(url)
+            if download is None:
+                download = self._downloads[url] = self.pool.submit(self._download, url)
+            self._pending.append(self.pool.submit(self._place, download, url, dst))
+    
+    def _download(self, url: str) -> Path:
+        """Fetch ``url`` into the content-addressed store, returns the stored path"""
+        with self._lock:
+            stored = self.urls.get(url)
+        if stored and (self.assets_dir / stored).exists():
+            METRICS.incr("assets_cached")
+            return self.assets_dir / stored
+        
+        ext = os.path.splitext(urlparse(url).path)[1].lower()[:8]
+        tmp = self.assets_dir / f".download.{threading.get_ident()}"
+        digest = hashlib.sha256()
+        quera_hosted = self.limiter is not None and self._is_quera_hosted(url)
+        try:
+            if quera_hosted:
+                self.limiter.acquire()
+            with METRICS.span("asset_fetch"):
+                with self.fetcher.session.get(url, stream=True, timeout=self.fetcher.timeout) as response:
+                    response.raise_for_status()
+                    if "accounts/login" in response.url:
+                        raise RuntimeError("redirected to the login page")
+                    if "text/html" in response.headers.get("Content-Type", ""):
+                        if quera_hosted and RATE_LIMIT_MARKER in response.text:
+                            METRICS.incr("rate_limit_hits")
+                            self.limiter.on_throttle()
+                            raise RuntimeError("rate limited")
+                        raise RuntimeError("got an HTML page instead of a file")
+                    with open(tmp, "wb") as f:
+                        for chunk in response.iter_content(1 << 16):
+                            digest.update(chunk)
+                            f.write(chunk)
+            name = f"{digest.hexdigest()[:2]}/{digest.hexdigest()}{ext}"
+            target = self.assets_dir / name
+            if target.exists():
+                METRICS.incr("assets_deduplicated")
+            else:
+                target.parent.mkdir(exist_ok=True)
+                os.replace(tmp, target)
+                METRICS.incr("assets_downloaded")
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        with self._lock:
+            self.urls[url] = name
+        return target
+    
+    def _place(self, download, url: str, dst: Optional[Path]):
+        try:
+            stored = download.result()
+            if dst is not None:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                place_file(stored, dst, mode="link")
+        except Exception as e:
+            METRICS.incr("asset_errors")
+            logger.warning(f"      ⚠️ Asset {url}: {e}")
+    
+    def wait(self):
+        """Block until every queued asset is in place and save the URL index"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+        if pending:
+            logger.info(f"🖼️ {len(pending)} assets placed ({len(self.urls)} unique URLs in {self.assets_dir})")
+        with self._lock:
+            atomic_write_text(str(self.index_file), json.dumps(self.urls, indent=1))
+    
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.wait()
+        self.pool.shutdown()
+        self.fetcher.close()
+
 # ==================== QUERA SCRAPER CLASS ====================
 
 class QueraScraper:
     BASE_URL = "https://quera.org"
+    STATEMENT_SELECTOR = "div[id^='description_md-'], article"
     
-    def __init__(self, email: str, password: str, headless: bool = False):
+    def __init__(self, email: str, password: str, headless: bool = True,
+                 refresh_older_than: Optional[float] = None, fetch_mode: str = "browser",
+                 workers: int = 1, requests_per_minute: Optional[float] = None,
+                 limiter: Optional[RateLimiter] = None, memory_cap_mb: Optional[float] = None,
+                 resume: bool = False, store: Optional[ProblemStore] = None,
+                 listing_ttl: Optional[Dict[str, Optional[float]]] = None,
+                 download_assets: bool = True, asset_workers: int = 4,
+                 browser_profile: str = "lean", profile_dir: Optional[str] = CHROME_PROFILE_DIR,
+                 max_requests: Optional[int] = None, max_minutes: Optional[float] = None,
+                 search: Optional[SearchIndex] = None):
         self.email = email
         self.password = password
+        self.refresh_older_than = refresh_older_than
+        self.resume = resume
+        self.manifest: Optional[ScrapeManifest] = None
+        self.store = store
         
-        self.options = webdriver.ChromeOptions()
-        self.options.add_experimental_option("detach", True)
-        self.options.add_argument("--disable-blink-features=AutomationControlled")
-        if headless:
-            self.options.add_argument("--headless=new")
+        self.browser_profile = browser_profile
+        self.headless = headless
+        self.profile_dir = profile_dir
         
-        self.driver = webdriver.Chrome(options=self.options)
-        self.wait = WebDriverWait(self.driver, 20)
+        # Chrome is started lazily, only when a page really needs it
+        self._driver = None
+        self._wait = None
+        self._driver_has_cookies = False
         self.cookies_file = "quera_cookies.pkl"
         
+        # "http" reads server-rendered pages with requests and falls back to Chrome
+        self.http = HttpFetcher(self.cookies_file, pool_size=max(workers, 1)) if fetch_mode == "http" else None
+        self._local = threading.local()
+        
+        # Concurrent problem fetches need the HTTP backend; every page load goes through the limiter
+        self.workers = workers if self.http else 1
+        self.limiter = limiter or RateLimiter(requests_per_minute or DEFAULT_REQUESTS_PER_MINUTE)
+        
+        # Orders assignments by urgency and stops once the run's budget is spent
+        self.scheduler = ScrapeScheduler(max_requests, max_minutes * 60 if max_minutes else None)
+        
+        # Set once the session is known to be authenticated, cleared on a login redirect
+        self._logged_in = False
+        
+        # Chrome is restarted once its process tree grows past this many MB
+        self.memory_cap_mb = memory_cap_mb
+        
+        # Called with the problem folder after each new or changed statement is saved
+        self.on_problem_saved: Optional[Callable[[str], None]] = None
+        
+        # Listings are reused until their per-level TTL expires (set up in list_courses)
+        self.listing_ttl = listing_ttl
+        self.listing: Optional[ListingIndex] = None
+        
+        # Images and attachments are fetched in the background while scraping goes on
+        self.download_assets = download_assets
+        self.asset_workers = asset_workers
+        self.assets: Optional[AssetDownloader] = None
+        
+        # Full-text index updated as each problem is saved
+        self.search = search
+        
         self.target_courses = {
             "14834": "مبانی برنامه‌سازی-پاییز ۱۴۰۲",
             "17076": "برنامه سازی پیشرفته",
@@ -118,6 +1499,79 @@ class QueraScraper:
             "23310": "طراحی و تحلیل الگوریتم‌ها",
         }
     
+    @property
+    def _soup(self) -> Optional[BeautifulSoup]:
+        """Current server-rendered page, per thread"""
+        return getattr(self._local, "soup", None)
+    
+    @_soup.setter
+    def _soup(self, soup: Optional[BeautifulSoup]):
+        self._local.soup = soup
+    
+    @staticmethod
+    def _chrome_options(headless: bool, browser_profile: str, profile_dir: Optional[str]):
+        """Chrome options; ``lean`` returns at DOMContentLoaded and keeps a persistent profile"""
+        options = webdriver.ChromeOptions()
+        options.add_argument("--disable-blink-features=AutomationControlled")
+        if headless:
+            options.add_argument("--headless=new")
+        if browser_profile == "lean":
+            options.page_load_strategy = "eager"
+            if profile_dir:
+                options.add_argument(f"--user-data-dir={os.path.abspath(profile_dir)}")
+            for arg in ("--blink-settings=imagesEnabled=false", "--disable-extensions", "--mute-audio",
+                        "--no-first-run", "--disable-background-networking", "--disable-sync"):
+                options.add_argument(arg)
+        else:
+            options.add_experimental_option("detach", True)
+        return options
+    
+    @property
+    def driver(self):
+        if self._driver is None:
+            logger.info(f"🌐 Starting Chrome ({self.browser_profile})...")
+            options = self._chrome_options(self.headless, self.browser_profile, self.profile_dir)
+            with METRICS.span("browser_start"):
+                self._driver = webdriver.Chrome(options=options)
+            self._wait = WebDriverWait(self._driver, 20)
+            self._driver_has_cookies = False
+            if self.browser_profile == "lean":
+                try:
+                    self._driver.execute_cdp_cmd("Network.enable", {})
+                    self._driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+                except selenium_errors.WebDriverException as e:
+                    logger.warning(f"Request blocking unavailable: {e}")
+        return self._driver
+    
+    @property
+    def wait(self) -> WebDriverWait:
+        if self._wait is None:
+            self.driver
+        return self._wait
+    
+    def restart_driver(self):
+        """Quit Chrome and start a fresh one with the saved session"""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except:
+                pass
+        self._driver = None
+        self._wait = None
+        self.load_cookies()
+    
+    def _check_memory(self):
+        """Recycle Chrome if it has grown past ``memory_cap_mb``"""
+        if self._driver is None or not self.memory_cap_mb:
+            return
+        try:
+            rss = process_tree_rss_mb(self._driver.service.process.pid)
+        except (AttributeError, OSError):
+            return
+        if rss > self.memory_cap_mb:
+            logger.info(f"♻️ Chrome uses {rss:.0f} MB (cap {self.memory_cap_mb:.0f} MB), restarting")
+            self.restart_driver()
+    
     def save_cookies(self):
         try:
             with open(self.cookies_file, "wb") as f:
@@ -131,7 +1585,6 @@ class QueraScraper:
             return False
         try:
             self.driver.get(self.BASE_URL)
-            time.sleep(2)
             with open(self.cookies_file, "rb") as f:
                 for cookie in pickle.load(f):
                     cookie.pop("sameSite", None)
@@ -139,6 +1592,7 @@ class QueraScraper:
                         self.driver.add_cookie(cookie)
                     except:
                         pass
+            self._driver_has_cookies = True
             logger.info("🍪 Cookies loaded")
             return True
         except Exception as e:
@@ -146,14 +1600,19 @@ class QueraScraper:
             return False
     
     def is_logged_in(self) -> bool:
+        """Check the session once by opening the dashboard; the result is cached"""
+        if self._logged_in:
+            return True
         try:
             self.driver.get(f"{self.BASE_URL}/dashboard")
-            time.sleep(4)
-            return "accounts/login" not in self.driver.current_url
+            self.wait.until(lambda d: "accounts/login" in d.current_url
+                            or d.execute_script("return document.readyState") != "loading")
+            self._logged_in = "accounts/login" not in self.driver.current_url
         except:
-            return False
+            self._logged_in = False
+        return self._logged_in
     
-    @retry(tries=3, delay=3, exceptions=(TimeoutException, WebDriverException))
+    @retry(tries=3, delay=3, exceptions=lambda: (selenium_errors.WebDriverException,))
     def login(self):
         logger.info("🚀 Logging in to Quera...")
         self.driver.get(f"{self.BASE_URL}/accounts/login")
@@ -164,13 +1623,17 @@ class QueraScraper:
         pass_field = self.wait.until(EC.visibility_of_element_located((By.NAME, "password")))
         pass_field.send_keys(self.password, Keys.RETURN)
         
-        self.wait.until_not(EC.url_contains("/accounts/login"))
-        
-        if self.is_logged_in():
-            logger.info("✅ Login successful")
-            self.save_cookies()
-        else:
+        try:
+            self.wait.until_not(EC.url_contains("/accounts/login"))
+        except selenium_errors.TimeoutException:
             raise RuntimeError("Login failed")
+        
+        self._logged_in = True
+        self._driver_has_cookies = True
+        logger.info("✅ Login successful")
+        self.save_cookies()
+        if self.http:
+            self.http.load_cookies()
     
     def scrape_all_courses(self, base_dir: str = BASE_DIR):
         """Main scraping method - scrapes all courses and saves statements"""
@@ -178,35 +1641,152 @@ class QueraScraper:
         logger.info("🚀 STARTING QUERA SCRAPER")
         logger.info("=" * 70)
         
-        # Login
-        if self.load_cookies() and self.is_logged_in():
+        courses = self.list_courses(base_dir)
+        
+        # List every course first so the most urgent assignments of all courses go first
+        course_assignments: Dict[str, List[Dict]] = {}
+        for course in courses:
+            if not self.scheduler.budget_left():
+                break
+            course_dir = self.course_dir(course, base_dir)
+            course_assignments[course["id"]] = self.list_assignments(course)
+            for priority, assignment in self._prioritized(course_assignments[course["id"]]):
+                self.scheduler.push(priority, (assignment, course_dir))
+        
+        while True:
+            item = self.scheduler.pop()
+            if item is None:
+                break
+            self._scrape_assignment(*item)
+            self._check_memory()
+        
+        for course_id, assignments in course_assignments.items():
+            self.manifest.record_course(course_id, [a["id"] for a in assignments])
+        self._log_budget()
+        
+        if self.assets:
+            self.assets.wait()
+        logger.info(f"✅ Scraping complete! Files in: {os.path.abspath(base_dir)}")
+    
+    def ensure_logged_in(self):
+        """Reuse the saved session if it is still valid, otherwise log in"""
+        if self._logged_in:
+            return
+        if self.http and self.http.is_logged_in(self.BASE_URL):
+            self._logged_in = True
+            logger.info("✅ Using existing session (HTTP)")
+        elif self.load_cookies() and self.is_logged_in():
             logger.info("✅ Using existing session")
         else:
             self.login()
-        
-        # Navigate and get courses
-        self.driver.get(f"{self.BASE_URL}/course")
-        human_sleep(5, 8)
-        
-        courses = self._extract_course_links()
+    
+    def list_courses(self, base_dir: str) -> List[Dict]:
+        """Log in, open the manifest and return the target courses"""
+        self.ensure_logged_in()
         os.makedirs(base_dir, exist_ok=True)
+        self.listing = ListingIndex(os.path.join(base_dir, LISTING_FILE), self.listing_ttl)
         
-        for course in courses:
-            self._scrape_course(course, base_dir)
-            human_sleep(15, 30)
+        courses = self.listing.get("courses")
+        if courses is not None:
+            logger.info(f"✅ {len(courses)} target courses (cached listing)")
+        else:
+            # Navigate and get courses
+            self._open(f"{self.BASE_URL}/course", needs="a[href*='/course/']")
+            courses = self._extract_course_links()
+            self.listing.put("courses", "", courses)
+        journal = CheckpointJournal(os.path.join(base_dir, JOURNAL_FILE), resume=self.resume)
+        self.manifest = ScrapeManifest(os.path.join(base_dir, MANIFEST_FILE), self.refresh_older_than,
+                                       journal=journal, store=self.store)
+        if self.download_assets:
+            self.assets = AssetDownloader(os.path.join(base_dir, ASSETS_DIR), self.cookies_file,
+                                          workers=self.asset_workers, limiter=self.limiter,
+                                          base_url=self.BASE_URL)
+        return courses
+    
+    def _open(self, url: str, needs: Optional[str] = None, browser: bool = True) -> bool:
+        """Load a page over HTTP when possible, otherwise in Chrome.
         
-        logger.info(f"✅ Scraping complete! Files in: {os.path.abspath(base_dir)}")
+        ``needs`` is a CSS selector that must be present in the server-rendered
+        HTML; if it is missing the page probably needs JavaScript. With
+        ``browser=False`` no Chrome fallback happens and False is returned.
+        """
+        self._soup = None
+        self.limiter.acquire()
+        self.scheduler.charge()
+        METRICS.incr("pages")
+        http_expired = False
+        if self.http:
+            try:
+                with METRICS.span("http_fetch"):
+                    html = self.http.get(url)
+                if html is not None:
+                    soup = BeautifulSoup(html, "lxml")
+                    if (needs is None or soup.select_one(needs) is not None
+                            or RATE_LIMIT_MARKER in html):
+                        self._soup = soup
+                        return True
+                    logger.info("      ↪️ Page needs JavaScript, using Chrome")
+                else:
+                    http_expired = True
+                    logger.info("      ↪️ HTTP session expired, using Chrome")
+            except requests.RequestException as e:
+                logger.warning(f"      HTTP fetch error: {e}, using Chrome")
+        if not browser:
+            return False
+        with METRICS.span("page_load"):
+            self.driver.get(url)
+        if "accounts/login" in self.driver.current_url and not self._driver_has_cookies and self.load_cookies():
+            # A Chrome started after the session was confirmed over HTTP has no cookies yet
+            with METRICS.span("page_load"):
+                self.driver.get(url)
+        if "accounts/login" in self.driver.current_url:
+            logger.info("      ↪️ Session expired, logging in again")
+            self._logged_in = False
+            self.login()
+            with METRICS.span("page_load"):
+                self.driver.get(url)
+        elif http_expired:
+            # Chrome is still signed in: hand its cookies to the HTTP session
+            self.save_cookies()
+            self.http.load_cookies()
+        if needs:
+            # With the eager load strategy the page may still be rendering
+            try:
+                with METRICS.span("webdriver_wait"):
+                    self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, needs)))
+            except selenium_errors.TimeoutException:
+                logger.warning(f"      ⚠️ Timed out waiting for {needs}")
+        return True
+    
+    def _page_source(self) -> str:
+        return str(self._soup) if self._soup is not None else self.driver.page_source
+    
+    def _anchors(self, selector: str) -> List[Dict[str, str]]:
+        """Return href, text and data-pid of anchors on the current page"""
+        if self._soup is not None:
+            return [{
+                "href": a.get("href") or "",
+                "text": a.get_text("\n", strip=True),
+                "pid": a.get("data-pid") or "",
+            } for a in self._soup.select(selector)]
+        return [{
+            "href": link.get_attribute("href") or "",
+            "text": link.text or "",
+            "pid": link.get_attribute("data-pid") or "",
+        } for link in self.driver.find_elements(By.CSS_SELECTOR, selector)]
     
     def _extract_course_links(self) -> List[Dict]:
         """Extract target course links"""
         found = []
-        links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='/course/']")
+        seen = set()
+        links = self._anchors("a[href*='/course/']")
         
         for link in links:
-            href = link.get_attribute("href") or ""
+            href = link["href"]
             try:
                 course_id = href.split("/course/")[1].split("/")[0].split("?")[0].strip()
-                if course_id in self.target_courses and course_id not in [c["id"] for c in found]:
+                if course_id in self.target_courses and course_id not in seen:
+                    seen.add(course_id)
                     found.append({
                         "id": course_id,
                         "name": self.target_courses[course_id],
@@ -222,31 +1802,110 @@ class QueraScraper:
         """Scrape a single course"""
         logger.info(f"\n📚 Processing: {course['name']}")
         
+        course_dir = self.course_dir(course, base_dir)
+        assignments = self.list_assignments(course)
+        
+        for _, assignment in self._prioritized(assignments):
+            if not self.scheduler.budget_left():
+                break
+            self._scrape_assignment(assignment, course_dir)
+            self._check_memory()
+        
+        self.manifest.record_course(course["id"], [a["id"] for a in assignments])
+    
+    def _prioritized(self, assignments: List[Dict]) -> List[tuple]:
+        """(priority, assignment) pairs still worth scraping, most urgent first"""
+        ranked = []
+        for assignment in assignments:
+            if self._assignment_done(assignment):
+                logger.info(f"  ⏭️ Skipping unchanged assignment: {assignment['name']}")
+                continue
+            priority = self.assignment_priority(assignment)
+            if priority is None:
+                logger.info(f"  ⏭️ Skipping closed assignment: {assignment['name']}")
+                continue
+            ranked.append((priority, assignment))
+        ranked.sort(key=lambda pair: pair[0])
+        return ranked
+    
+    def _assignment_done(self, assignment: Dict) -> bool:
+        """True if the assignment's listing is still fresh and all of its problems are done.
+        
+        Courses and assignments are always listed (through the listing TTLs),
+        so new assignments and problems are picked up once a listing expires.
+        """
+        key = ScrapeManifest.assignment_key(assignment["course_id"], assignment["id"])
+        problems = self.listing.get("problems", key)
+        return bool(problems) and self.manifest.problems_done(
+            assignment["course_id"], assignment["id"], [p["id"] for p in problems])
+    
+    def assignment_priority(self, assignment: Dict) -> Optional[tuple]:
+        """Scheduling priority of an assignment, None if it is closed and already archived.
+        
+        New assignments or ones with never-fetched problems come first, then
+        ones whose problem listing changed since their last scrape, then
+        stale re-fetches of open assignments, then closed ones. Within a tier
+        higher (newer) assignment ids go first.
+        """
+        key = ScrapeManifest.assignment_key(assignment["course_id"], assignment["id"])
+        newest = -int(assignment["id"]) if assignment["id"].isdigit() else 0
+        recorded = self.manifest.data["assignments"].get(key)
+        entry = self.listing.peek("problems", key)
+        if entry is None:
+            return (ScrapeScheduler.NEW if recorded is None else ScrapeScheduler.CHANGED, newest)
+        
+        fetched = self.manifest.data["problems"]
+        unfetched = [p for p in entry["items"]
+                     if ScrapeManifest.problem_key(assignment["course_id"], assignment["id"], p["id"]) not in fetched]
+        if entry.get("closed"):
+            return (ScrapeScheduler.CLOSED, newest) if unfetched else None
+        if recorded is None or unfetched:
+            return (ScrapeScheduler.NEW, newest)
+        if entry.get("changed_at", 0) > recorded["fetched_at"] or self.listing.get("problems", key) is None:
+            return (ScrapeScheduler.CHANGED, newest)
+        return (ScrapeScheduler.STALE, newest)
+    
+    def _log_budget(self):
+        if not self.scheduler.budget_left():
+            logger.info(f"💸 Run budget spent after {self.scheduler.requests} requests, "
+                        f"{len(self.scheduler)} queued items left for the next run")
+    
+    @staticmethod
+    def course_dir(course: Dict, base_dir: str) -> str:
         course_dir = os.path.join(base_dir, f"{course['id']}_{safe_filename(course['name'])}")
         os.makedirs(course_dir, exist_ok=True)
+        return course_dir
+    
+    def list_assignments(self, course: Dict) -> List[Dict]:
+        """Return a course's assignments, opening the course page only if the listing expired"""
+        assignments = self.listing.get("assignments", course["id"])
+        if assignments is not None:
+            logger.info(f"  ➜ {len(assignments)} assignments (cached listing)")
+            return assignments
         
-        self.driver.get(course["url"])
-        human_sleep(5, 8)
-        
+        self._open(course["url"], needs="a[href*='/course/assignments/']")
         # Get assignments
         assignments = self._get_assignments()
-        
         for assignment in assignments:
-            self._scrape_assignment(assignment, course_dir)
-            human_sleep(10, 20)
+            assignment["course_id"] = course["id"]
+            assignment["course_name"] = course["name"]
+        self.listing.put("assignments", course["id"], assignments)
+        return assignments
     
     def _get_assignments(self) -> List[Dict]:
         """Get assignments from current course page"""
         assignments = []
-        links = self.driver.find_elements(By.CSS_SELECTOR, "a[href*='/course/assignments/']")
+        seen = set()
+        links = self._anchors("a[href*='/course/assignments/']")
         
         for link in links:
-            href = link.get_attribute("href") or ""
+            href = link["href"]
             try:
                 assignment_id = href.split("/assignments/")[1].split("/")[0].strip()
-                name = (link.text or "").strip() or f"Assignment {assignment_id}"
+                name = link["text"].strip() or f"Assignment {assignment_id}"
                 
-                if assignment_id not in [a["id"] for a in assignments]:
+                if assignment_id not in seen:
+                    seen.add(assignment_id)
                     assignments.append({
                         "id": assignment_id,
                         "name": name,
@@ -262,31 +1921,91 @@ class QueraScraper:
         """Scrape a single assignment"""
         logger.info(f"  📝 Assignment: {assignment['name']}")
         
-        assignment_dir = os.path.join(course_dir, f"{assignment['id']}_{safe_filename(assignment['name'])}")
-        os.makedirs(assignment_dir, exist_ok=True)
+        assignment_dir = os.path.join(course_dir, f"{assignment['id']}_{safe_filename(assignment['name'])}")
+        os.makedirs(assignment_dir, exist_ok=True)
+        
+        # Get problems
+        problems = self.list_problems(assignment)
+        
+        # Closed assignments no longer change, so their fetched problems are never refreshed
+        entry = self.listing.peek("problems", ScrapeManifest.assignment_key(assignment["course_id"], assignment["id"]))
+        closed = bool(entry and entry.get("closed"))
+        fetched = self.manifest.data["problems"]
+        
+        pending = []
+        for problem in problems:
+            problem["course_id"] = assignment["course_id"]
+            problem["assignment_id"] = assignment["id"]
+            problem["course_name"] = assignment.get("course_name", "")
+            problem["assignment_name"] = assignment["name"]
+            key = ScrapeManifest.problem_key(assignment["course_id"], assignment["id"], problem["id"])
+            if (self.manifest.problem_done(assignment["course_id"], assignment["id"], problem["id"])
+                    or closed and key in fetched):
+                logger.info(f"    ⏭️ Skipping unchanged problem: {problem['name']}")
+                continue
+            pending.append(problem)
+        
+        # Never-fetched problems first, then the stalest
+        pending.sort(key=lambda p: fetched.get(ScrapeManifest.problem_key(
+            p["course_id"], p["assignment_id"], p["id"]), {}).get("fetched_at", 0))
+        
+        if self.workers > 1 and len(pending) > 1:
+            # Fetch over HTTP in parallel; pages that need Chrome are done serially afterwards
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                fetched_ok = list(pool.map(
+                    lambda p: (not self.scheduler.budget_left()
+                               or self._scrape_problem(p, assignment_dir, browser=False)), pending))
+            pending = [p for p, ok in zip(pending, fetched_ok) if not ok]
         
-        self.driver.get(assignment["url"])
-        human_sleep(5, 8)
+        for problem in pending:
+            if not self.scheduler.budget_left():
+                break
+            self._scrape_problem(problem, assignment_dir)
         
-        # Get problems
+        self.manifest.record_assignment(assignment["course_id"], assignment["id"],
+                                        [p["id"] for p in problems])
+    
+    def list_problems(self, assignment: Dict) -> List[Dict]:
+        """Return an assignment's problems, opening its page only if the listing expired"""
+        key = ScrapeManifest.assignment_key(assignment["course_id"], assignment["id"])
+        problems = self.listing.get("problems", key)
+        if problems is not None:
+            logger.info(f"    ➜ {len(problems)} problems (cached listing)")
+            return problems
+        
+        self._open(assignment["url"], needs="a[data-pid]")
         problems = self._get_problems()
+        self.listing.put("problems", key, problems, closed=self._assignment_closed())
+        return problems
+    
+    def _assignment_closed(self) -> bool:
+        """True if the current assignment page's own status says it is over.
         
-        for problem in problems:
-            self._scrape_problem(problem, assignment_dir)
-            human_sleep(5, 10)
+        Navigation, sidebars and links to other assignments are ignored, so
+        a finished assignment listed elsewhere on the page does not count.
+        """
+        soup = self._soup if self._soup is not None else BeautifulSoup(self._page_source(), "lxml")
+        for element in soup.select(ASSIGNMENT_STATUS_SELECTOR):
+            if element.find_parent(["nav", "aside", "footer", "a"]):
+                continue
+            if any(marker in element.get_text(" ") for marker in CLOSED_MARKERS):
+                return True
+        return False
     
     def _get_problems(self) -> List[Dict]:
         """Get problems from current assignment page"""
         problems = []
-        links = self.driver.find_elements(By.CSS_SELECTOR, "a[data-pid]")
+        seen = set()
+        links = self._anchors("a[data-pid]")
         
         for link in links:
-            problem_id = link.get_attribute("data-pid") or ""
-            if not problem_id:
+            problem_id = link["pid"]
+            if not problem_id or problem_id in seen:
                 continue
+            seen.add(problem_id)
             
-            href = link.get_attribute("href") or ""
-            name = (link.text or "").split("\n")[0].strip() or f"Problem {problem_id}"
+            href = link["href"]
+            name = link["text"].split("\n")[0].strip() or f"Problem {problem_id}"
             
             problems.append({
                 "id": problem_id,
@@ -297,71 +2016,565 @@ class QueraScraper:
         logger.info(f"    ➜ Found {len(problems)} problems")
         return problems
     
-    def _scrape_problem(self, problem: Dict, assignment_dir: str):
-        """Scrape a single problem and save statement"""
-        logger.info(f"    🔍 Problem: {problem['name']}")
+    @timed("scrape_problem")
+    def _scrape_problem(self, problem: Dict, assignment_dir: str, browser: bool = True) -> bool:
+        """Scrape a single problem and save statement.
         
-        self.driver.get(problem["url"])
-        human_sleep(5, 9)
+        Returns False if the page needs Chrome and ``browser`` is False.
+        """
+        logger.info(f"    🔍 Problem: {problem['name']}")
         
+        if not self._open(problem["url"], needs=self.STATEMENT_SELECTOR, browser=browser):
+            return False
         # Check rate limit
-        if "به کجا چنین شتابان" in self.driver.page_source:
-            logger.warning("⚠️ Rate limited! Waiting 90s...")
-            time.sleep(90)
-            self.driver.get(problem["url"])
-            human_sleep(5, 9)
+        if RATE_LIMIT_MARKER in self._page_source():
+            METRICS.incr("rate_limit_hits")
+            self.limiter.on_throttle()
+            if not self._open(problem["url"], needs=self.STATEMENT_SELECTOR, browser=browser):
+                return False
+        else:
+            self.limiter.on_success()
         
         try:
-            # Get problem text
-            markdown_div = self.wait.until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "div[id^='description_md-'], article"))
-            )
-            text = markdown_div.get_attribute("textContent") or ""
-            
-            # Get title
-            try:
-                title = self.driver.find_element(By.CSS_SELECTOR, "h1").text.strip()
-            except:
-                title = problem["name"]
+            title, text = self._problem_content(problem)
             
-            # Save to file
             problem_dir = os.path.join(assignment_dir, safe_filename(title))
-            os.makedirs(problem_dir, exist_ok=True)
+            content = f"{title}\n\n{text.strip()}"
+            samples, assets = self._extras(problem)
             
-            with open(os.path.join(problem_dir, "statement.txt"), "w", encoding="utf-8") as f:
-                f.write(f"{title}\n\n{text.strip()}")
+            if self.store:
+                # The store is the archive; folders are only written by its export
+                self.store.upsert_statement(problem["course_id"], problem["assignment_id"], problem["id"],
+                                            problem.get("course_name", ""), problem.get("assignment_name", ""),
+                                            title, safe_filename(title), content,
+                                            extras={"samples": samples, "assets": assets})
+                if self.assets:
+                    for url in assets.values():
+                        self.assets.submit(url)
+            else:
+                # Save to file
+                os.makedirs(problem_dir, exist_ok=True)
+                atomic_write_text(os.path.join(problem_dir, "statement.txt"), content)
+                self._save_extras(problem_dir, samples, assets)
             
-            logger.info(f"      ✅ Saved statement")
+            changed = self.manifest.record_problem(problem["course_id"], problem["assignment_id"],
+                                                   problem["id"], problem_dir, content)
+            if self.search:
+                self.search.upsert_problem(problem["course_id"], problem["assignment_id"], problem["id"],
+                                           problem.get("course_name", ""), problem.get("assignment_name", ""),
+                                           title, problem_dir, content)
+            METRICS.incr("problems_saved")
+            logger.info(f"      ✅ Saved statement{'' if changed else ' (unchanged)'}")
+            if changed and self.on_problem_saved:
+                self.on_problem_saved(problem_dir)
         
         except Exception as e:
             logger.error(f"      ❌ Error: {e}")
+        return True
+    
+    def _problem_content(self, problem: Dict):
+        """Return (title, statement text) of the current problem page"""
+        if self._soup is not None:
+            text = self._soup.select_one(self.STATEMENT_SELECTOR).get_text()
+            h1 = self._soup.select_one("h1")
+            title = h1.get_text(" ", strip=True) if h1 else ""
+            return title or problem["name"], text
+        
+        with METRICS.span("webdriver_wait"):
+            markdown_div = self.wait.until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, self.STATEMENT_SELECTOR))
+            )
+        text = markdown_div.get_attribute("textContent") or ""
+        try:
+            title = self.driver.find_element(By.CSS_SELECTOR, "h1").text.strip()
+        except:
+            title = problem["name"]
+        return title, text
+    
+    def _extras(self, problem: Dict):
+        """Return ([(sample input, sample output)], {asset file name: URL}) of the current problem page"""
+        soup = self._soup if self._soup is not None else BeautifulSoup(self._page_source(), "lxml")
+        statement = soup.select_one(self.STATEMENT_SELECTOR)
+        if statement is None:
+            return [], {}
+        samples, urls = self._statement_extras(statement, problem["url"])
+        assets = {}
+        for url in urls:
+            name = safe_filename(os.path.basename(urlparse(url).path))
+            if name in assets:
+                name = f"{len(assets)}_{name}"
+            assets[name] = url
+        if samples or assets:
+            logger.info(f"      📎 {len(samples)} samples, {len(assets)} assets")
+        return samples, assets
+    
+    def _save_extras(self, problem_dir: str, samples: List[tuple], assets: Dict[str, str]):
+        """Write sample cases to ``samples/<n>/{input,output}.txt`` and queue image/attachment downloads"""
+        for i, (sample_in, sample_out) in enumerate(samples, 1):
+            sample_dir = os.path.join(problem_dir, "samples", str(i))
+            os.makedirs(sample_dir, exist_ok=True)
+            atomic_write_text(os.path.join(sample_dir, "input.txt"), sample_in)
+            atomic_write_text(os.path.join(sample_dir, "output.txt"), sample_out)
+        
+        if self.assets:
+            for name, url in assets.items():
+                self.assets.submit(url, Path(problem_dir) / "assets" / name)
+    
+    @staticmethod
+    def _statement_extras(statement, page_url: str):
+        """Return ([(sample input, sample output)], [asset URLs]) of a problem statement element"""
+        inputs, outputs = [], []
+        for pre in statement.find_all("pre"):
+            heading = pre.find_previous(["h1", "h2", "h3", "h4", "h5", "h6", "strong", "p"])
+            label = heading.get_text(" ", strip=True) if heading else ""
+            if SAMPLE_INPUT_RE.search(label):
+                inputs.append(pre.get_text().strip("\n") + "\n")
+            elif SAMPLE_OUTPUT_RE.search(label):
+                outputs.append(pre.get_text().strip("\n") + "\n")
+        
+        assets = []
+        for img in statement.select("img[src]"):
+            assets.append(urljoin(page_url, img["src"]))
+        for link in statement.select("a[href]"):
+            if urlparse(link["href"]).path.lower().endswith(ATTACHMENT_EXTENSIONS):
+                assets.append(urljoin(page_url, link["href"]))
+        assets = [url for url in dict.fromkeys(assets) if url.startswith("http")]
+        return list(zip(inputs, outputs)), assets
     
     def close(self):
-        """Close browser"""
+        """Close browser, HTTP session, asset downloader and checkpoint journal"""
+        if self.assets:
+            self.assets.close()
+        if self.manifest:
+            self.manifest.save()
+        if self.manifest and self.manifest.journal:
+            self.manifest.journal.close()
+        if self.http:
+            self.http.close()
+        if self._driver is None:
+            return
         try:
-            self.driver.quit()
+            self._driver.quit()
         except:
             pass
 
+# ==================== LOCAL CLASSIFIER ====================
+
+class LocalClassifier:
+    """Offline TF-IDF nearest-centroid classifier.
+
+    Trained from the folders already organized under ``ORGANIZED_DIR`` (i.e.
+    from earlier LLM labels; folders it labelled itself are left out).
+    Confidence is the relative margin between the best and second-best
+    category similarity.
+    """
+    TOKEN_RE = re.compile(r"[^\W\d_]{2,}")
+    
+    def __init__(self, threshold: float = 0.35, max_features: int = 20000):
+        self.threshold = threshold
+        self.max_features = max_features
+        self.vocab: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.labels: List[str] = []
+    
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return cls.TOKEN_RE.findall(normalize_text(text))
+    
+    @staticmethod
+    def load_organized(organized_path: str):
+        """Return (texts, labels) from ``<organized>/<category>/<problem>/statement.txt``.
+        
+        Problems filed by the local model itself are skipped, so it is never
+        trained or evaluated on its own guesses.
+        """
+        texts, labels = [], []
+        for category in CATEGORIES:
+            for statement in sorted(Path(organized_path, category).glob("*/statement.txt")):
+                readme = statement.with_name("README.md")
+                if readme.exists() and LOCAL_LABEL_MARKER in readme.read_text(encoding="utf-8"):
+                    continue
+                texts.append(statement.read_text(encoding="utf-8"))
+                labels.append(category)
+        return texts, labels
+    
+    def fit(self, texts: List[str], labels: List[str]) -> "LocalClassifier":
+        docs = [set(self.tokenize(t)) for t in texts]
+        df: Dict[str, int] = {}
+        for doc in docs:
+            for token in doc:
+                df[token] = df.get(token, 0) + 1
+        kept = sorted(df, key=lambda t: (-df[t], t))[:self.max_features]
+        self.vocab = {token: i for i, token in enumerate(kept)}
+        counts = np.array([df[t] for t in kept], dtype=np.float32)
+        self.idf = np.log((1 + len(texts)) / (1 + counts)) + 1
+        
+        self.labels = sorted(set(labels))
+        label_index = np.array([self.labels.index(label) for label in labels])
+        centroids = np.zeros((len(self.labels), len(self.vocab)), dtype=np.float32)
+        for start in range(0, len(texts), 512):
+            np.add.at(centroids, label_index[start:start + 512], self._vectorize(texts[start:start + 512]))
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.maximum(norms, 1e-12)
+        return self
+    
+    def _vectorize(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized TF-IDF rows"""
+        rows, cols = [], []
+        for i, text in enumerate(texts):
+            ids = [self.vocab[t] for t in self.tokenize(text) if t in self.vocab]
+            rows.extend([i] * len(ids))
+            cols.extend(ids)
+        X = np.zeros((len(texts), len(self.vocab)), dtype=np.float32)
+        np.add.at(X, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)), 1.0)
+        X = np.log1p(X) * self.idf
+        return X / np.maximum(np.linalg.norm(X, axis=1, keepdims=True), 1e-12)
+    
+    def predict_many(self, texts: List[str], chunk: int = 512) -> List[tuple]:
+        """Return (category, confidence) for each text"""
+        results = []
+        for start in range(0, len(texts), chunk):
+            sims = self._vectorize(texts[start:start + chunk]) @ self.centroids.T
+            order = np.argsort(-sims, axis=1)
+            best = sims[np.arange(len(sims)), order[:, 0]]
+            second = sims[np.arange(len(sims)), order[:, 1]] if sims.shape[1] > 1 else 0.0
+            confidence = np.where(best > 0, (best - second) / np.maximum(best, 1e-12), 0.0)
+            results.extend((self.labels[i], float(c)) for i, c in zip(order[:, 0], confidence))
+        return results
+    
+    @classmethod
+    def evaluate(cls, texts: List[str], labels: List[str], folds: int = 5,
+                 threshold: float = 0.35) -> Dict[str, float]:
+        """K-fold accuracy against the LLM labels, overall and above ``threshold``"""
+        order = np.random.default_rng(0).permutation(len(texts))
+        correct = confident = confident_correct = 0
+        start = time.perf_counter()
+        for fold in range(folds):
+            test = set(order[fold::folds].tolist())
+            train_idx = [i for i in range(len(texts)) if i not in test]
+            model = cls(threshold).fit([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+            test_idx = sorted(test)
+            for i, (category, conf) in zip(test_idx, model.predict_many([texts[i] for i in test_idx])):
+                hit = category == labels[i]
+                correct += hit
+                if conf >= threshold:
+                    confident += 1
+                    confident_correct += hit
+        elapsed = time.perf_counter() - start
+        
+        report = {
+            "samples": len(texts),
+            "accuracy": correct / max(len(texts), 1),
+            "coverage": confident / max(len(texts), 1),
+            "confident_accuracy": confident_correct / max(confident, 1),
+            "statements_per_sec": len(texts) / max(elapsed, 1e-9),
+        }
+        logger.info(f"🧪 Local classifier ({folds}-fold, {len(texts)} samples): "
+                    f"accuracy {report['accuracy']:.1%}, "
+                    f"≥{threshold} covers {report['coverage']:.1%} at {report['confident_accuracy']:.1%}")
+        return report
+
+# ==================== SCRAPER POOL ====================
+
+class ScraperPool:
+    """Scrape with several browsers at once.
+
+    Courses (or assignments) are sharded over ``size`` workers, each with its
+    own ``QueraScraper`` and Chrome, all sharing the cookie jar in
+    ``quera_cookies.pkl``, one manifest and one global rate limit. The output
+    layout is the same as a single ``scrape_all_courses`` run.
+    """
+    
+    def __init__(self, email: str, password: str, size: int = 2, shard_by: str = "course",
+                 requests_per_minute: Optional[float] = None, **scraper_kwargs: Any):
+        self.email = email
+        self.password = password
+        self.size = max(size, 1)
+        self.shard_by = shard_by
+        self.limiter = RateLimiter(requests_per_minute or DEFAULT_REQUESTS_PER_MINUTE)
+        self.scraper_kwargs = scraper_kwargs
+        self.on_problem_saved: Optional[Callable[[str], None]] = None
+        self.scrapers: List[QueraScraper] = []
+    
+    def _new_scraper(self) -> QueraScraper:
+        # Chrome cannot share a profile directory between running instances
+        kwargs = dict(self.scraper_kwargs)
+        profile_dir = kwargs.get("profile_dir", CHROME_PROFILE_DIR)
+        if profile_dir:
+            kwargs["profile_dir"] = os.path.join(profile_dir, str(len(self.scrapers)))
+        scraper = QueraScraper(self.email, self.password, limiter=self.limiter, **kwargs)
+        scraper.on_problem_saved = self.on_problem_saved
+        self.scrapers.append(scraper)
+        return scraper
+    
+    def scrape_all_courses(self, base_dir: str = BASE_DIR):
+        logger.info("=" * 70)
+        logger.info(f"🚀 STARTING QUERA SCRAPER ({self.size} browsers, sharded by {self.shard_by})")
+        logger.info("=" * 70)
+        
+        # The first scraper logs in (saving cookies for the others) and lists the work
+        coordinator = self._new_scraper()
+        courses = coordinator.list_courses(base_dir)
+        manifest = coordinator.manifest
+        listing = coordinator.listing
+        assets = coordinator.assets
+        
+        # Work is handed out most urgent first, under one request budget for all browsers
+        work = coordinator.scheduler
+        course_assignments: Dict[str, List[Dict]] = {}
+        for course in courses:
+            if self.shard_by == "assignment":
+                course_dir = coordinator.course_dir(course, base_dir)
+                course_assignments[course["id"]] = coordinator.list_assignments(course)
+                for priority, assignment in coordinator._prioritized(course_assignments[course["id"]]):
+                    work.push(priority, ("assignment", assignment, course_dir))
+            else:
+                work.push((0,), ("course", course, base_dir))
+        
+        def run(scraper: QueraScraper):
+            scraper.manifest = manifest
+            scraper.listing = listing
+            scraper.assets = assets
+            scraper.scheduler = work
+            if scraper is not coordinator:
+                scraper.ensure_logged_in()
+            while True:
+                item = work.pop()
+                if item is None:
+                    return
+                kind, item, target_dir = item
+                try:
+                    if kind == "course":
+                        scraper._scrape_course(item, target_dir)
+                    else:
+                        scraper._scrape_assignment(item, target_dir)
+                        scraper._check_memory()
+                except Exception as e:
+                    logger.error(f"❌ {kind} {item['name']}: {e}")
+        
+        workers = [coordinator] + [self._new_scraper() for _ in range(min(self.size, len(work)) - 1)]
+        threads = [threading.Thread(target=run, args=(scraper,), name=f"scraper-{i}")
+                   for i, scraper in enumerate(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        for course_id, assignments in course_assignments.items():
+            manifest.record_course(course_id, [a["id"] for a in assignments])
+        coordinator._log_budget()
+        if assets:
+            assets.wait()
+        
+        logger.info(f"✅ Scraping complete! Files in: {os.path.abspath(base_dir)}")
+    
+    def close(self):
+        for scraper in self.scrapers:
+            scraper.close()
+
+# ==================== DUPLICATE DETECTION ====================
+
+class DuplicateIndex:
+    """MinHash/LSH index of near-duplicate problem statements.
+
+    Statements are normalized (Persian/Arabic letters and digits,
+    whitespace), split into character shingles and MinHashed. LSH bands
+    propose candidates, and pairs whose estimated Jaccard similarity
+    reaches ``threshold`` are grouped.
+    """
+    PRIME = 4294967311  # smallest prime above 2**32
+    
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32, shingle: int = 5):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(1, 2**32, size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, 2**32, size=(num_perm, 1), dtype=np.uint64)
+    
+    def signature(self, text: str) -> np.ndarray:
+        text = normalize_text(text)
+        shingles = {text[i:i + self.shingle] for i in range(max(len(text) - self.shingle + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(sh.encode("utf-8")) for sh in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self.a * hashes + self.b) % self.PRIME).min(axis=1)
+    
+    def cluster(self, texts: Dict[Any, str]) -> List[List[Any]]:
+        """Group keys whose texts are near-duplicates; singletons are included"""
+        keys = list(texts)
+        signatures = np.stack([self.signature(texts[k]) for k in keys]) if keys else np.zeros((0, 0))
+        parent = list(range(len(keys)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = {}
+            rows = signatures[:, band * self.rows:(band + 1) * self.rows]
+            for i, row in enumerate(rows):
+                buckets.setdefault(row.tobytes(), []).append(i)
+            for members in buckets.values():
+                for j in members[1:]:
+                    root_i, root_j = find(members[0]), find(j)
+                    if root_i != root_j and np.mean(signatures[members[0]] == signatures[j]) >= self.threshold:
+                        parent[root_j] = root_i
+        
+        groups: Dict[int, List[Any]] = {}
+        for i, key in enumerate(keys):
+            groups.setdefault(find(i), []).append(key)
+        return list(groups.values())
+
+# ==================== AI RESPONSE CACHE ====================
+
+class ResponseCache:
+    """Content-addressed SQLite store of LLM responses.
+
+    Entries older than ``max_age_days`` are dropped and the table is trimmed
+    to the ``max_entries`` most recently used rows.
+    """
+    
+    def __init__(self, path: str = AI_CACHE_FILE, max_entries: int = 50000,
+                 max_age_days: Optional[float] = 180):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = None if max_age_days is None else max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+            " created_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        self.conn.commit()
+        self.evict()
+    
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        return content_hash(json.dumps(parts, ensure_ascii=False))
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT response, created_at FROM responses WHERE key = ?",
+                                    (key,)).fetchone()
+            if row and (self.max_age is None or time.time() - row[1] < self.max_age):
+                self.conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+                self.conn.commit()
+                self.hits += 1
+                METRICS.incr("llm_cache_hits")
+                return row[0]
+            self.misses += 1
+            METRICS.incr("llm_cache_misses")
+            return None
+    
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                              (key, response, now, now))
+            self.conn.commit()
+    
+    def evict(self):
+        """Drop expired entries and trim to ``max_entries``"""
+        with self._lock:
+            if self.max_age is not None:
+                self.conn.execute("DELETE FROM responses WHERE created_at < ?",
+                                  (time.time() - self.max_age,))
+            self.conn.execute(
+                "DELETE FROM responses WHERE key NOT IN ("
+                " SELECT key FROM responses ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
 # ==================== AI CLASSIFIER ====================
 
 class AIClassifier:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-            default_headers={
-                "HTTP-Referer": "http://localhost:5000",
-                "X-Title": "Quera Classifier"
-            }
-        )
+    def __init__(self, api_key: str, workers: int = 4, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, max_retries: int = 5,
+                 cache: Optional[ResponseCache] = None, local: Optional[LocalClassifier] = None,
+                 batch_tokens: Optional[int] = None, base_url: str = OPENROUTER_BASE_URL,
+                 organize_mode: str = "copy", dedup: Optional[DuplicateIndex] = None,
+                 stream: bool = False, search: Optional[SearchIndex] = None):
+        # The OpenAI client is created on the first request that misses the cache
+        self.api_key = api_key
+        self.base_url = base_url
+        self._client = None
+        self._client_lock = threading.Lock()
+        
+        self.workers = max(workers, 1)
+        self.max_retries = max_retries
+        self.request_limiter = RateLimiter(requests_per_minute, cooldown=10) if requests_per_minute else None
+        self.token_limiter = (RateLimiter(tokens_per_minute, burst=tokens_per_minute)
+                              if tokens_per_minute else None)
+        self.tokens_used = 0
+        self._tokens_lock = threading.Lock()
+        self.cache = cache
+        self.local = local
+        self.batch_tokens = batch_tokens
+        self.organize_mode = organize_mode
+        self.dedup = dedup
+        self._duplicates: Dict[Path, List[Path]] = {}
+        self.stream = stream
+        self.search = search
     
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = openai.OpenAI(
+                    base_url=self.base_url,
+                    api_key=self.api_key,
+                    max_retries=0,  # retries are handled by _complete
+                    default_headers={
+                        "HTTP-Referer": "http://localhost:5000",
+                        "X-Title": "Quera Classifier"
+                    }
+                )
+            return self._client
+    
+    @timed("classify_and_summarize")
     def classify_and_summarize(self, problem_text: str) -> str:
         """Classify problem and generate bilingual summary"""
+        key = None
+        if self.cache:
+            key = self._cache_key(problem_text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        response = self._complete([
+            {"role": "system", "content": "You are an expert at classifying CS problems."},
+            {"role": "user", "content": self._build_prompt(problem_text)}
+        ])
+        
+        content = response.choices[0].message.content
+        if self.cache:
+            self.cache.put(key, content)
+        return content
+    
+    def _cache_key(self, problem_text: str) -> str:
+        """Cache key of a single-problem answer; only the part of the statement the prompt uses counts"""
+        return ResponseCache.make_key(problem_text[:STATEMENT_PROMPT_CHARS], self._build_prompt(""),
+                                      AI_MODEL, AI_TEMPERATURE)
+    
+    @staticmethod
+    def _build_prompt(problem_text: str) -> str:
+        """Classification prompt for one problem"""
         categories_list = "\n".join([f"{i+1}. {name} - {desc}" 
                                      for i, (name, desc) in enumerate(CATEGORIES.items())])
         
-        prompt = f"""You are an expert at classifying CS problems.
+        return f"""You are an expert at classifying CS problems.
 
 Given a programming problem:
 1. Classify into ONE category
@@ -372,7 +2585,7 @@ Categories:
 {categories_list}
 
 Problem:
-{problem_text[:2000]}
+{problem_text[:STATEMENT_PROMPT_CHARS]}
 
 Format:
 CATEGORY: [exact category name like "01_Linear_Data_Structures"]
@@ -383,17 +2596,212 @@ CATEGORY: [exact category name like "01_Linear_Data_Structures"]
 ## Persian Summary / خلاصه فارسی
 [خلاصه با فرمول‌های LaTeX]
 """
+    
+    def classify_batch(self, problems: Dict[str, str]) -> Dict[str, str]:
+        """Classify several problems in one request.
         
-        response = self.client.chat.completions.create(
-            model="openai/gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are an expert at classifying CS problems."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
+        ``problems`` maps an id to its statement. Answers come back in the
+        single-problem format, each headed by a ``=== PROBLEM <id> ===`` line,
+        so LaTeX needs no escaping; entries that are missing or malformed
+        fall back to ``classify_and_summarize``.
+        """
+        results: Dict[str, str] = {}
+        keys: Dict[str, str] = {}
+        for pid, text in problems.items():
+            if self.cache:
+                keys[pid] = self._cache_key(text)
+                cached = self.cache.get(keys[pid])
+                if cached is not None:
+                    results[pid] = cached
+        pending = {pid: text for pid, text in problems.items() if pid not in results}
+        
+        if len(pending) > 1:
+            try:
+                response = self._complete([
+                    {"role": "system", "content": "You are an expert at classifying CS problems."},
+                    {"role": "user", "content": self._build_batch_prompt(pending)}
+                ])
+                parsed = self._parse_batch_response(response.choices[0].message.content)
+            except (AttributeError, TypeError, IndexError) as e:
+                logger.warning(f"   Batch response unusable ({e}), falling back")
+                parsed = {}
+            except openai.APIStatusError as e:
+                # 429/5xx were already retried; anything else (e.g. an oversized batch) is per batch
+                if e.status_code == 429 or e.status_code >= 500:
+                    raise
+                logger.warning(f"   Batch request rejected ({e.status_code}), falling back")
+                parsed = {}
+            for pid in pending:
+                if pid in parsed:
+                    results[pid] = parsed[pid]
+                    if self.cache:
+                        self.cache.put(keys[pid], parsed[pid])
+        
+        for pid, text in pending.items():
+            if pid not in results:
+                results[pid] = self.classify_and_summarize(text)
+        return results
+    
+    @staticmethod
+    def _build_batch_prompt(problems: Dict[str, str]) -> str:
+        """Classification prompt for several problems, answered one section per problem"""
+        categories_list = "\n".join([f"{i+1}. {name} - {desc}" 
+                                     for i, (name, desc) in enumerate(CATEGORIES.items())])
+        problems_text = "\n\n".join(f"### Problem {pid}\n{text[:STATEMENT_PROMPT_CHARS]}" for pid, text in problems.items())
+        
+        return f"""You are an expert at classifying CS problems.
+
+For EACH programming problem below:
+1. Classify into ONE category
+2. Extract core problem (remove stories)
+3. Provide summaries in English and Persian with LaTeX support
+
+Categories:
+{categories_list}
+
+{problems_text}
+
+Answer every problem in this format, starting each answer with its id line exactly as shown.
+Write LaTeX as is, without escaping.
+
+=== PROBLEM <problem id> ===
+CATEGORY: [exact category name like "01_Linear_Data_Structures"]
+
+## English Summary
+[summary with $inline$ and $$block$$ LaTeX]
+
+## Persian Summary / خلاصه فارسی
+[خلاصه با فرمول‌های LaTeX]
+"""
+    
+    @staticmethod
+    def _parse_batch_response(text: str) -> Dict[str, str]:
+        """Map problem id to a single-problem style response, skipping bad entries"""
+        parts = BATCH_SECTION_RE.split(text)
+        parsed = {}
+        # parts = [preamble, id, answer, id, answer, ...]
+        for pid, answer in zip(parts[1::2], parts[2::2]):
+            answer = answer.strip()
+            category = re.search(r"^CATEGORY:\s*(\S+)", answer, re.M)
+            english = re.search(r"^## English Summary\s*\n\s*\S", answer, re.M)
+            if not category or category.group(1) not in CATEGORIES or not english:
+                continue
+            parsed[pid] = answer + "\n"
+        return parsed
+    
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]]) -> int:
+        """Rough prompt size plus room for the answer (Persian text is ~3 chars/token)"""
+        return sum(len(m["content"]) for m in messages) // 3 + 800
+    
+    def _complete(self, messages: List[Dict[str, str]], stream: bool = False):
+        """Chat completion under the RPM/TPM budget, retrying 429/5xx with jitter.
         
-        return response.choices[0].message.content
+        With ``stream=True`` the chunk stream is returned once the request is
+        accepted; its usage is counted by ``_stream_lines``.
+        """
+        delay = 2.0
+        for attempt in range(self.max_retries):
+            if self.request_limiter:
+                self.request_limiter.acquire()
+            if self.token_limiter:
+                self.token_limiter.acquire(self._estimate_tokens(messages))
+            try:
+                with METRICS.span("llm_request"):
+                    response = self.client.chat.completions.create(
+                        model=AI_MODEL,
+                        messages=messages,
+                        temperature=AI_TEMPERATURE,
+                        **({"stream": True, "stream_options": {"include_usage": True}} if stream else {})
+                    )
+                METRICS.incr("llm_requests")
+                if self.request_limiter:
+                    self.request_limiter.on_success()
+                if not stream and response.usage:
+                    self._count_tokens(response.usage.total_tokens)
+                return response
+            except (openai.RateLimitError, openai.APIStatusError, openai.APIConnectionError) as e:
+                status = getattr(e, "status_code", None)
+                if status is not None and status != 429 and status < 500:
+                    raise
+                if attempt == self.max_retries - 1:
+                    raise
+                if status == 429 and self.request_limiter:
+                    self.request_limiter.on_throttle()
+                wait = delay * random.uniform(0.5, 1.5)
+                logger.warning(f"   LLM error ({status or type(e).__name__}), "
+                               f"retry {attempt+1}/{self.max_retries} after {wait:.1f}s")
+                METRICS.incr("llm_retries")
+                with METRICS.span("retry_backoff"):
+                    time.sleep(wait)
+                delay *= 2
+    
+    def _count_tokens(self, tokens: int):
+        METRICS.incr("llm_tokens", tokens)
+        with self._tokens_lock:
+            self.tokens_used += tokens
+    
+    def _stream_lines(self, stream) -> Iterator[str]:
+        """Complete lines of a streamed answer, as soon as each one has arrived"""
+        start = time.perf_counter()
+        buffer = ""
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                self._count_tokens(chunk.usage.total_tokens)
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if start is not None:
+                METRICS.observe("llm_first_token", time.perf_counter() - start)
+                start = None
+            *lines, buffer = (buffer + chunk.choices[0].delta.content).split("\n")
+            yield from lines
+        if buffer:
+            yield buffer
+    
+    def organize_streaming(self, root: Path, output_path: Path, problem_text: Optional[str] = None) -> str:
+        """Classify and file one problem from a streamed answer, returns its category.
+        
+        The destination folder is chosen as soon as the ``CATEGORY:`` line
+        arrives; the README is then written line by line as the summary streams in.
+        """
+        if problem_text is None:
+            problem_text = read_statement(root / "statement.txt")
+        key = None
+        if self.cache:
+            key = self._cache_key(problem_text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                category = self._extract_category(cached)
+                self._write_problem(root, output_path / category, cached)
+                return category
+        
+        stream = self._complete([
+            {"role": "system", "content": "You are an expert at classifying CS problems."},
+            {"role": "user", "content": self._build_prompt(problem_text)}
+        ], stream=True)
+        lines = self._stream_lines(stream)
+        received: List[str] = []
+        
+        # The answer starts with the CATEGORY line; give up waiting for it after a few lines
+        category = "00_Uncategorized"
+        for line in lines:
+            received.append(line)
+            if line.startswith("CATEGORY:"):
+                category = self._extract_category(line)
+                break
+            if len(received) >= 5:
+                break
+        
+        def rest():
+            yield from received
+            for line in lines:
+                received.append(line)
+                yield line
+        
+        self._write_problem(root, output_path / category, rest())
+        if self.cache:
+            self.cache.put(key, "\n".join(received))
+        return category
     
     def organize_problems(self, base_path: str, output_path: str):
         """Organize all problems by category"""
@@ -403,61 +2811,300 @@ CATEGORY: [exact category name like "01_Linear_Data_Structures"]
         
         base_path = Path(base_path)
         output_path = Path(output_path)
-        output_path.mkdir(exist_ok=True)
+        stats = self._prepare_output(output_path)
         
-        # Create category folders
-        for cat in list(CATEGORIES.keys()) + ["00_Uncategorized"]:
-            (output_path / cat).mkdir(exist_ok=True)
+        problem_dirs = [Path(root) for root, dirs, files in os.walk(base_path) if "statement.txt" in files]
+        start = time.monotonic()
+        tokens_start = self.tokens_used
         
-        stats = {cat: 0 for cat in list(CATEGORIES.keys()) + ["00_Uncategorized"]}
+        # Only one representative per group of near-duplicates is classified
+        if self.dedup:
+            groups = self.dedup.cluster({root: (root / "statement.txt").read_text(encoding="utf-8")
+                                         for root in sorted(problem_dirs)})
+            self._duplicates = {group[0]: group[1:] for group in groups if len(group) > 1}
+            problem_dirs = [group[0] for group in groups]
+            duplicates = sum(len(d) for d in self._duplicates.values())
+            logger.info(f"🧬 {duplicates} near-duplicates folded into {len(self._duplicates)} problems")
+        total = len(problem_dirs)
         
-        # Process all problems
-        for root, dirs, files in os.walk(base_path):
-            if "statement.txt" not in files:
-                continue
-            
-            folder_name = Path(root).name
-            statement_path = Path(root) / "statement.txt"
-            
-            try:
-                logger.info(f"📄 Processing: {folder_name}")
-                
-                with open(statement_path, 'r', encoding='utf-8') as f:
-                    problem_text = f.read()
-                
-                # Classify
-                ai_response = self.classify_and_summarize(problem_text)
-                category = self._extract_category(ai_response)
-                
-                logger.info(f"   📁 Category: {category}")
-                
-                # Copy to organized folder
-                problem_folder = output_path / category / folder_name
-                problem_folder.mkdir(exist_ok=True)
-                
-                for file in Path(root).glob("*"):
-                    if file.is_file():
-                        shutil.copy2(file, problem_folder / file.name)
-                
-                # Create README
-                readme_lines = [line for line in ai_response.split('\n') 
-                               if not line.startswith('CATEGORY:')]
-                with open(problem_folder / "README.md", 'w', encoding='utf-8') as f:
-                    f.write(f"# {folder_name}\n\n{''.join(readme_lines).strip()}")
-                
-                stats[category] += 1
-                logger.info(f"   ✅ Done")
+        # Confident local predictions skip the LLM entirely
+        local_done = 0
+        if self.local:
+            remaining = []
+            for root, (category, conf) in self._predict_local(problem_dirs):
+                if conf < self.local.threshold:
+                    remaining.append(root)
+                    continue
+                try:
+                    self._write_problem(root, output_path / category, self._local_response(category, conf))
+                    stats[category] += 1
+                    local_done += 1
+                except Exception as e:
+                    logger.error(f"   ❌ {root.name}: {e}")
+            logger.info(f"🏠 Local classifier handled {local_done}/{total}, "
+                        f"{len(remaining)} go to the LLM")
+            problem_dirs = remaining
+        
+        # Classify concurrently, write each result as soon as it arrives
+        if self.batch_tokens:
+            groups = self._pack_batches(problem_dirs)
+            logger.info(f"📦 Packed {len(problem_dirs)} problems into {len(groups)} requests")
+        else:
+            groups = [[root] for root in problem_dirs]
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._organize_group, group, output_path) for group in groups]
+            for future in as_completed(futures):
+                for root, category in future.result():
+                    done += 1
+                    if isinstance(category, Exception):
+                        outcome = f"❌ Error: {category}"
+                    else:
+                        stats[category] += 1
+                        outcome = f"📁 {category}"
                 
-            except Exception as e:
-                logger.error(f"   ❌ Error: {e}")
+                    elapsed = max(time.monotonic() - start, 1e-9)
+                    logger.info(f"[{local_done + done}/{total}] {root.name}: {outcome} | "
+                                f"{done / elapsed:.2f} problems/s, "
+                                f"{(self.tokens_used - tokens_start) / elapsed:.0f} tokens/s")
         
+        self._log_results(stats, total, time.monotonic() - start, self.tokens_used - tokens_start,
+                          local_done)
+    
+    @staticmethod
+    def _prepare_output(output_path: Path) -> Dict[str, int]:
+        """Create category folders, returns zeroed per-category stats"""
+        output_path.mkdir(exist_ok=True)
+        for cat in list(CATEGORIES.keys()) + ["00_Uncategorized"]:
+            (output_path / cat).mkdir(exist_ok=True)
+        return {cat: 0 for cat in list(CATEGORIES.keys()) + ["00_Uncategorized"]}
+    
+    def _log_results(self, stats: Dict[str, int], total: int, elapsed: float, tokens: int,
+                     local_done: int):
         # Print stats
         logger.info("\n" + "=" * 70)
         logger.info("📊 CLASSIFICATION RESULTS:")
         for cat, count in stats.items():
             if count > 0:
                 logger.info(f"   {cat}: {count} problems")
+        logger.info(f"   ⏱️ {total} problems in {elapsed:.1f}s, {tokens} tokens")
+        if self.cache:
+            logger.info(f"   💾 Cache: {self.cache.hits} hits, {self.cache.misses} misses")
+        if self.local:
+            logger.info(f"   🏠 Local: {local_done}, 🌐 LLM: {total - local_done}")
+        logger.info("=" * 70)
+    
+    def _classify_text(self, problem_text: str) -> tuple:
+        """Local tier first, then the LLM; returns (ai_response, was_local)"""
+        if self.local:
+            category, conf = self.local.predict_many([problem_text])[0]
+            if conf >= self.local.threshold:
+                return self._local_response(category, conf), True
+        return self.classify_and_summarize(problem_text), False
+    
+    def organize_one(self, root: Path, output_path: Path) -> tuple:
+        """Classify and organize a single problem folder, returns (category, was_local)"""
+        # The local model reads the whole statement, the LLM only its beginning
+        problem_text = read_statement(root / "statement.txt", None if self.local else STATEMENT_PROMPT_CHARS)
+        if self.stream:
+            if self.local:
+                category, conf = self.local.predict_many([problem_text])[0]
+                if conf >= self.local.threshold:
+                    self._write_problem(root, output_path / category, self._local_response(category, conf))
+                    return category, True
+            return self.organize_streaming(root, output_path, problem_text[:STATEMENT_PROMPT_CHARS]), False
+        ai_response, was_local = self._classify_text(problem_text)
+        category = self._extract_category(ai_response)
+        self._write_problem(root, output_path / category, ai_response)
+        return category, was_local
+    
+    def organize_store(self, store: ProblemStore):
+        """Classify store rows that are new or changed, without touching the file tree"""
         logger.info("=" * 70)
+        logger.info("🤖 AI CLASSIFICATION (problem store)")
+        logger.info("=" * 70)
+        
+        rows = store.pending_classification()
+        stats = {cat: 0 for cat in list(CATEGORIES.keys()) + ["00_Uncategorized"]}
+        
+        # Near-duplicates share the classification of their representative
+        copies: Dict[tuple, List[sqlite3.Row]] = {}
+        if self.dedup:
+            by_key = {(r["course_id"], r["assignment_id"], r["problem_id"]): r for r in rows}
+            for group in self.dedup.cluster({key: row["statement"] for key, row in by_key.items()}):
+                copies[group[0]] = [by_key[key] for key in group[1:]]
+            rows = [by_key[key] for key in copies]
+        start = time.monotonic()
+        tokens_start = self.tokens_used
+        local_done = 0
+        
+        def classify(row):
+            return self._classify_text(row["statement"])
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(classify, row): row for row in rows}
+            for done, future in enumerate(as_completed(futures), 1):
+                row = futures[future]
+                try:
+                    ai_response, was_local = future.result()
+                    category = self._extract_category(ai_response)
+                    key = (row["course_id"], row["assignment_id"], row["problem_id"])
+                    for member in [row] + copies.get(key, []):
+                        store.set_classification(member["course_id"], member["assignment_id"],
+                                                 member["problem_id"], category,
+                                                 self._readme_body(ai_response), member["statement_hash"])
+                        if self.search:
+                            self.search.set_category(category, self._readme_body(ai_response),
+                                                     key=(member["course_id"], member["assignment_id"],
+                                                          member["problem_id"]))
+                    stats[category] += 1 + len(copies.get(key, []))
+                    local_done += was_local
+                    METRICS.incr("problems_classified")
+                    outcome = f"📁 {category}"
+                except Exception as e:
+                    outcome = f"❌ Error: {e}"
+                logger.info(f"[{done}/{len(rows)}] {row['folder']}: {outcome}")
+        
+        self._log_results(stats, len(rows), time.monotonic() - start, self.tokens_used - tokens_start,
+                          local_done)
+    
+    def _classify_file(self, statement_path: Path) -> str:
+        return self.classify_and_summarize(read_statement(statement_path))
+    
+    def _predict_local(self, problem_dirs: List[Path], chunk: int = 256) -> Iterator[tuple]:
+        """(root, (category, confidence)) for each folder, reading statements a chunk at a time"""
+        for start in range(0, len(problem_dirs), chunk):
+            roots = problem_dirs[start:start + chunk]
+            texts = [read_statement(root / "statement.txt", None) for root in roots]
+            yield from zip(roots, self.local.predict_many(texts))
+    
+    def _pack_batches(self, problem_dirs: List[Path]) -> List[List[Path]]:
+        """Group problems so each request stays within ``batch_tokens``"""
+        overhead = self._estimate_tokens([{"content": self._build_batch_prompt({})}])
+        groups: List[List[Path]] = []
+        current: List[Path] = []
+        used = overhead
+        for root in problem_dirs:
+            size = min((root / "statement.txt").stat().st_size // 2, 2000) // 3 + 400
+            if current and used + size > self.batch_tokens:
+                groups.append(current)
+                current, used = [], overhead
+            current.append(root)
+            used += size
+        if current:
+            groups.append(current)
+        return groups
+    
+    def _classify_group(self, roots: List[Path]) -> List[tuple]:
+        """Classify a group of problem folders, returns (root, response or exception) pairs"""
+        if len(roots) == 1:
+            try:
+                return [(roots[0], self._classify_file(roots[0] / "statement.txt"))]
+            except Exception as e:
+                return [(roots[0], e)]
+        try:
+            texts = {str(i): read_statement(root / "statement.txt") for i, root in enumerate(roots, 1)}
+            responses = self.classify_batch(texts)
+            return [(root, responses[str(i)]) for i, root in enumerate(roots, 1)]
+        except Exception as e:
+            return [(root, e) for root in roots]
+    
+    def _organize_group(self, roots: List[Path], output_path: Path) -> List[tuple]:
+        """Classify and file a group of problem folders, returns (root, category or exception) pairs"""
+        if self.stream and len(roots) == 1:
+            try:
+                return [(roots[0], self.organize_streaming(roots[0], output_path))]
+            except Exception as e:
+                return [(roots[0], e)]
+        results = []
+        for root, ai_response in self._classify_group(roots):
+            try:
+                if isinstance(ai_response, Exception):
+                    raise ai_response
+                category = self._extract_category(ai_response)
+                self._write_problem(root, output_path / category, ai_response)
+                results.append((root, category))
+            except Exception as e:
+                results.append((root, e))
+        return results
+    
+    @staticmethod
+    def _local_response(category: str, confidence: float) -> str:
+        """Response in the LLM format for a locally classified problem"""
+        return (f"CATEGORY: {category}\n\n"
+                f"_{LOCAL_LABEL_MARKER} (confidence {confidence:.2f}); "
+                f"no AI summary yet._\n")
+    
+    def _write_problem(self, root: Path, category_path: Path, ai_response):
+        """Place a problem folder in its category and create its README.
+        
+        A folder already filed under another category is moved rather than
+        duplicated, and files that are already up to date are left alone.
+        ``ai_response`` is the answer text or an iterable of its lines (e.g.
+        still streaming in), which is written to the README as it comes.
+        """
+        folder_name = root.name
+        problem_folder = relocate_problem_folder(category_path.parent, category_path.name, folder_name,
+                                                 str(root.resolve()))
+        
+        with METRICS.span("organize_copy"):
+            for file in root.rglob("*"):
+                if file.is_file():
+                    target = problem_folder / file.relative_to(root)
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    METRICS.incr(f"files_{place_file(file, target, self.organize_mode)}")
+        
+        # Create README next to the old one, replacing it only if it changed
+        readme = problem_folder / "README.md"
+        part = readme.with_name(f"README.md.part{threading.get_ident()}")
+        lines = ai_response.split("\n") if isinstance(ai_response, str) else ai_response
+        body: List[str] = []
+        try:
+            with open(part, "w", encoding="utf-8") as f:
+                f.write(f"# {folder_name}\n\n")
+                for i, line in enumerate(self._readme_lines(lines)):
+                    f.write(f"\n{line}" if i else line)
+                    body.append(line)
+                if self._duplicates.get(root):
+                    copies = "\n".join(f"- `{dup.parent.name}/{dup.name}`" for dup in self._duplicates[root])
+                    f.write(f"\n\n## Also appears in\n{copies}\n")
+            if readme.exists() and file_hash(readme) == file_hash(part):
+                part.unlink()
+            else:
+                os.replace(part, readme)
+        finally:
+            if part.exists():
+                part.unlink()
+        write_problem_sources(problem_folder, {str(path.resolve()): file_hash(path / "statement.txt")
+                                               for path in [root] + self._duplicates.get(root, [])})
+        if self.search:
+            for path in [root] + self._duplicates.get(root, []):
+                self.search.set_category(category_path.name, "\n".join(body), path=path)
+        METRICS.incr("problems_classified")
+    
+    @staticmethod
+    def _readme_lines(lines: Iterable[str]) -> Iterator[str]:
+        """Answer lines without the CATEGORY line and surrounding blank lines"""
+        started = False
+        blank: List[str] = []
+        for line in lines:
+            if line.startswith("CATEGORY:"):
+                continue
+            if not line.strip():
+                if started:
+                    blank.append(line)
+                continue
+            if not started:
+                line = line.lstrip()
+                started = True
+            yield from blank
+            blank = []
+            yield line
+    
+    @classmethod
+    def _readme_body(cls, ai_response: str) -> str:
+        """AI response without the CATEGORY line"""
+        return "\n".join(cls._readme_lines(ai_response.split("\n")))
     
     def _extract_category(self, ai_response: str) -> str:
         """Extract category from AI response"""
@@ -468,33 +3115,142 @@ CATEGORY: [exact category name like "01_Linear_Data_Structures"]
                     return category
         return "00_Uncategorized"
 
+# ==================== STREAMING PIPELINE ====================
+
+class ProblemPipeline:
+    """Classify and organize problems while the scraper is still running.
+
+    The scraper pushes each saved problem folder into a bounded queue; when
+    the classifier workers fall behind, ``submit`` blocks and slows the
+    scraper down instead of letting it run far ahead.
+    """
+    
+    def __init__(self, classifier: AIClassifier, output_path: str, queue_size: int = 16):
+        self.classifier = classifier
+        self.output_path = Path(output_path)
+        self.queue: "queue.Queue[Optional[Path]]" = queue.Queue(maxsize=queue_size)
+        self.stats = classifier._prepare_output(self.output_path)
+        self.total = 0
+        self.local_done = 0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._worker, name=f"classifier-{i}", daemon=True)
+                         for i in range(classifier.workers)]
+        self._start = time.monotonic()
+        self._tokens_start = classifier.tokens_used
+        self._submitted: Set[Path] = set()
+        self._backfill: Optional[threading.Thread] = None
+    
+    def start(self) -> "ProblemPipeline":
+        for thread in self._threads:
+            thread.start()
+        return self
+    
+    def submit(self, problem_dir: str):
+        """Queue a problem folder, blocking while the queue is full"""
+        with self._lock:
+            self._submitted.add(Path(problem_dir).resolve())
+        self.queue.put(Path(problem_dir))
+    
+    def backfill(self, base_dir: str):
+        """Queue, in the background, scraped folders the scraper will not resubmit.
+        
+        The scraper only submits problems it saves as changed, so folders
+        already on disk are queued here if they were never organized or
+        their statement changed since they were.
+        """
+        self._backfill = threading.Thread(target=self._queue_unorganized, args=(base_dir,),
+                                          name="classifier-backfill", daemon=True)
+        self._backfill.start()
+    
+    def _queue_unorganized(self, base_dir: str):
+        organized = organized_sources(self.output_path)
+        queued = 0
+        for root, dirs, files in os.walk(base_dir):
+            if "statement.txt" not in files:
+                continue
+            root = Path(root)
+            with self._lock:
+                if root.resolve() in self._submitted:
+                    continue
+            folder, digest = organized.get(str(root.resolve()), (None, None))
+            if (folder and (folder / "README.md").exists()
+                    and digest == file_hash(root / "statement.txt")):
+                continue
+            self.submit(str(root))
+            queued += 1
+        logger.info(f"   🔁 Queued {queued} scraped problems not organized yet")
+    
+    def _worker(self):
+        while True:
+            root = self.queue.get()
+            if root is None:
+                return
+            try:
+                category, was_local = self.classifier.organize_one(root, self.output_path)
+                outcome = f"📁 {category}"
+            except Exception as e:
+                category, was_local, outcome = None, False, f"❌ Error: {e}"
+            with self._lock:
+                self.total += 1
+                if category:
+                    self.stats[category] += 1
+                self.local_done += was_local
+                done = self.total
+            logger.info(f"   🔄 [{done}] {root.name}: {outcome} (queue: {self.queue.qsize()})")
+    
+    def finish(self):
+        """Drain the queue, stop the workers and log the results"""
+        if self._backfill:
+            self._backfill.join()
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self.classifier._log_results(self.stats, self.total, time.monotonic() - self._start,
+                                     self.classifier.tokens_used - self._tokens_start, self.local_done)
+
 # ==================== GITHUB UPLOADER ====================
 
 class GitHubUploader:
-    def __init__(self, local_path: str, username: str, repo_name: str):
+    # Files published from the organized tree; everything else stays local
+    UPLOAD_EXTENSIONS = (".c", ".cpp", ".py", ".java", ".js", ".cs", ".go")
+    
+    def __init__(self, local_path: str, username: str, repo_name: str,
+                 remote_url: Optional[str] = None, branch: str = "main",
+                 commit_per_category: bool = False):
         self.local_path = Path(local_path)
         self.username = username
         self.repo_name = repo_name
+        self.remote_url = remote_url or f"https://github.com/{username}/{repo_name}.git"
+        self.branch = branch
+        self.commit_per_category = commit_per_category
+    
+    def _git(self, *args: str, input: Optional[str] = None, check: bool = True) -> subprocess.CompletedProcess:
+        with METRICS.span(f"git_{args[0].lstrip('-')}"):
+            return subprocess.run(["git", *args], cwd=self.local_path, input=input,
+                                  capture_output=True, text=True, check=check)
     
     def upload(self):
-        """Upload to GitHub"""
+        """Commit changed problem folders and fast-forward push them"""
         logger.info("=" * 70)
         logger.info("🚀 UPLOADING TO GITHUB")
         logger.info("=" * 70)
         
-        os.chdir(self.local_path)
+        if not self.local_path.is_dir():
+            logger.error(f"❌ Nothing to upload: {self.local_path} does not exist, run the classify step first")
+            return
         
         # Check Git
         try:
-            subprocess.run(["git", "--version"], check=True, capture_output=True)
-        except:
+            self._git("--version")
+        except (OSError, subprocess.CalledProcessError):
             logger.error("❌ Git not installed!")
             return
         
         # Initialize
         if not (self.local_path / ".git").exists():
-            subprocess.run(["git", "init"], check=True)
-            subprocess.run(["git", "branch", "-M", "main"], check=True)
+            self._git("init")
+            self._git("symbolic-ref", "HEAD", f"refs/heads/{self.branch}")
         
         # Create README
         self._create_readme()
@@ -502,28 +3258,66 @@ class GitHubUploader:
         # Create .gitignore
         self._create_gitignore()
         
-        # Add files
-        subprocess.run(["git", "add", "README.md"], check=True)
-        subprocess.run(["git", "add", ".gitignore"], check=True)
-        subprocess.run(["git", "add", "**/README.md"], check=True)
-        
-        for ext in [".c", ".cpp", ".py", ".java", ".js", ".cs", ".go"]:
-            subprocess.run(["git", "add", f"**/*{ext}"], capture_output=True)
-        
-        # Commit
-        subprocess.run(["git", "commit", "-m", "Add Quera problems with AI summaries"], check=True)
+        # Commit only what changed since the last commit
+        changed = self._changed_files()
+        if changed:
+            groups: Dict[str, List[str]] = {}
+            for path in changed:
+                top = path.split("/", 1)[0] if self.commit_per_category and "/" in path else ""
+                groups.setdefault(top, []).append(path)
+            
+            self._git("add", "-A", "--pathspec-from-file=-", "--pathspec-file-nul",
+                      input="\0".join(changed))
+            for category in sorted(groups):
+                paths = groups[category]
+                problems = len({p.split("/")[1] for p in paths if p.count("/") >= 2})
+                if category:
+                    message = f"Update {category}: {problems} problems"
+                elif problems:
+                    message = f"Update Quera problems: {problems} problems"
+                else:
+                    message = "Update repository files"
+                self._git("commit", "-m", message, "--pathspec-from-file=-", "--pathspec-file-nul",
+                          input="\0".join(paths))
+                logger.info(f"✅ Committed: {message}")
+        else:
+            logger.info("✅ No changes to commit")
         
         # Add remote
-        remote_url = f"https://github.com/{self.username}/{self.repo_name}.git"
-        result = subprocess.run(["git", "remote"], capture_output=True, text=True)
-        if "origin" not in result.stdout:
-            subprocess.run(["git", "remote", "add", "origin", remote_url], check=True)
+        if "origin" not in self._git("remote").stdout.split():
+            self._git("remote", "add", "origin", self.remote_url)
         
-        # Push
-        subprocess.run(["git", "push", "-u", "origin", "main", "--force"], check=True)
+        # Push (fast-forward only, remote history is never rewritten)
+        result = self._git("push", "-u", "origin", self.branch, check=False)
+        if result.returncode != 0:
+            logger.error(f"❌ Push rejected, pull the remote changes first:\n{result.stderr.strip()}")
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
         
         logger.info(f"🎉 SUCCESS! Check: https://github.com/{self.username}/{self.repo_name}")
     
+    def _changed_files(self) -> List[str]:
+        """Publishable files added, modified or deleted since the last commit"""
+        status = self._git("status", "--porcelain", "-z", "--untracked-files=all").stdout
+        entries = status.split("\0")
+        changed = []
+        i = 0
+        while i < len(entries):
+            entry = entries[i]
+            i += 1
+            if len(entry) < 4:
+                continue
+            code, path = entry[:2], entry[3:]
+            if "R" in code or "C" in code:
+                # Renames are followed by their source path
+                changed.append(entries[i])
+                i += 1
+            changed.append(path)
+        return [p for p in changed if self._is_published(p)]
+    
+    def _is_published(self, path: str) -> bool:
+        name = path.rsplit("/", 1)[-1]
+        return path in ("README.md", ".gitignore", "index.json") or name == "README.md" or name.endswith(self.UPLOAD_EXTENSIONS)
+    
     def _create_readme(self):
         """Create main README"""
         readme = """# 🎯 Quera Programming Problems
@@ -577,39 +3371,272 @@ __pycache__/
 
 # ==================== MAIN PIPELINE ====================
 
-def main():
-    """Complete pipeline: Scrape → Classify → Upload"""
+def _build_classifier(args, search: Optional[SearchIndex] = None) -> AIClassifier:
+    """AI classifier configured from command-line arguments"""
+    local = None
+    if args.local_threshold is not None:
+        texts, labels = LocalClassifier.load_organized(ORGANIZED_DIR)
+        if len(set(labels)) >= 2:
+            local = LocalClassifier(args.local_threshold).fit(texts, labels)
+            logger.info(f"🏠 Local classifier trained on {len(texts)} problems")
+        else:
+            logger.warning("Not enough organized problems to train the local classifier")
     
-    # Step 1: Scrape Quera
+    return AIClassifier(OPENROUTER_API_KEY, workers=args.ai_workers, local=local,
+                        requests_per_minute=args.ai_rpm, tokens_per_minute=args.ai_tpm,
+                        batch_tokens=args.batch_tokens, organize_mode=args.organize_mode,
+                        dedup=DuplicateIndex(args.dedup) if args.dedup else None,
+                        cache=None if args.no_ai_cache else ResponseCache(AI_CACHE_FILE),
+                        stream=args.stream, search=search)
+
+def _run_scrape(args, store: Optional[ProblemStore] = None, pipeline: Optional[ProblemPipeline] = None,
+                search: Optional[SearchIndex] = None):
+    """Step 1: scrape Quera into ``BASE_DIR`` (and the store, if any)"""
     logger.info("\n" + "=" * 70)
-    logger.info("STEP 1: SCRAPING QUERA")
+    logger.info("STEP 1: SCRAPING QUERA" + (" (classifying as problems arrive)" if pipeline else ""))
     logger.info("=" * 70 + "\n")
     
-    scraper = QueraScraper(QUERA_EMAIL, QUERA_PASSWORD, headless=False)
+    listing_ttl = dict(zip(LISTING_TTL_HOURS, args.listing_ttl)) if args.listing_ttl else None
+    if args.browsers > 1:
+        scraper = ScraperPool(QUERA_EMAIL, QUERA_PASSWORD, size=args.browsers, shard_by=args.shard_by,
+                              requests_per_minute=args.rpm, headless=not args.show_browser,
+                              browser_profile=args.browser_profile,
+                              refresh_older_than=args.refresh_older_than,
+                              fetch_mode=args.fetch_mode,
+                              memory_cap_mb=args.browser_memory_cap,
+                              resume=args.resume, store=store, listing_ttl=listing_ttl,
+                              download_assets=not args.no_assets, asset_workers=args.asset_workers,
+                              max_requests=args.max_requests, max_minutes=args.max_minutes,
+                              search=search)
+    else:
+        scraper = QueraScraper(QUERA_EMAIL, QUERA_PASSWORD, headless=not args.show_browser,
+                               browser_profile=args.browser_profile,
+                               refresh_older_than=args.refresh_older_than,
+                               fetch_mode=args.fetch_mode,
+                               workers=args.workers,
+                               requests_per_minute=args.rpm,
+                               memory_cap_mb=args.browser_memory_cap,
+                               resume=args.resume, store=store, listing_ttl=listing_ttl,
+                               download_assets=not args.no_assets, asset_workers=args.asset_workers,
+                               max_requests=args.max_requests, max_minutes=args.max_minutes,
+                               search=search)
+    if pipeline:
+        scraper.on_problem_saved = pipeline.submit
+        pipeline.backfill(BASE_DIR)
     try:
         scraper.scrape_all_courses(BASE_DIR)
     finally:
         scraper.close()
-    
-    # Step 2: Classify with AI
+        if pipeline:
+            pipeline.finish()
+
+def _run_classify(args, classifier: AIClassifier, store: Optional[ProblemStore] = None):
+    """Step 2: classify scraped problems into ``ORGANIZED_DIR``"""
     logger.info("\n" + "=" * 70)
     logger.info("STEP 2: AI CLASSIFICATION")
     logger.info("=" * 70 + "\n")
     
-    classifier = AIClassifier(OPENROUTER_API_KEY)
-    classifier.organize_problems(BASE_DIR, ORGANIZED_DIR)
-    
-    # Step 3: Upload to GitHub
+    if store:
+        classifier.organize_store(store)
+        store.export_tree(ORGANIZED_DIR, os.path.join(BASE_DIR, ASSETS_DIR))
+    else:
+        classifier.organize_problems(BASE_DIR, ORGANIZED_DIR)
+
+def _run_search(args):
+    """Print problems matching the keywords and filters from ``SEARCH_INDEX_FILE``"""
+    search = SearchIndex(SEARCH_INDEX_FILE)
+    try:
+        with METRICS.span("search_query"):
+            rows = search.search(" ".join(args.keywords), course=args.course, assignment=args.assignment,
+                                 category=args.category, limit=args.limit,
+                                 rank_candidates=args.rank_candidates)
+    finally:
+        search.close()
+    if args.json:
+        print(json.dumps([dict(row) for row in rows], ensure_ascii=False, indent=1))
+        return
+    for row in rows:
+        print(f"{row['category'] or '-':<28} {row['course_name']} / {row['assignment_name']} / {row['title']}")
+        print(f"{'':<28} {row['path']}")
+    print(f"{len(rows)} problem(s)", file=sys.stderr)
+
+def _run_upload(args):
+    """Step 3: push ``ORGANIZED_DIR`` to GitHub"""
     logger.info("\n" + "=" * 70)
     logger.info("STEP 3: GITHUB UPLOAD")
     logger.info("=" * 70 + "\n")
     
-    uploader = GitHubUploader(ORGANIZED_DIR, GITHUB_USERNAME, GITHUB_REPO_NAME)
+    uploader = GitHubUploader(ORGANIZED_DIR, GITHUB_USERNAME, GITHUB_REPO_NAME,
+                              commit_per_category=args.commit_per_category)
     uploader.upload()
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Command line with one subcommand per pipeline stage"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--metrics-prefix", default=METRICS_PREFIX,
+                        help="write run metrics to PREFIX.json and PREFIX.prom")
+    stored = argparse.ArgumentParser(add_help=False)
+    stored.add_argument("--store", action="store_true",
+                        help=f"keep problems in {PROBLEM_STORE_FILE} and export {ORGANIZED_DIR} from it")
+    stored.add_argument("--no-search-index", action="store_true",
+                        help=f"do not update {SEARCH_INDEX_FILE} and {ORGANIZED_DIR}/index.json")
     
-    logger.info("\n" + "=" * 70)
-    logger.info("✅ COMPLETE PIPELINE FINISHED!")
-    logger.info("=" * 70)
+    scrape = argparse.ArgumentParser(add_help=False)
+    group = scrape.add_argument_group("scraping")
+    group.add_argument("--fetch-mode", choices=["browser", "http"], default="browser",
+                       help="'http' reuses saved cookies and only starts Chrome when needed")
+    group.add_argument("--workers", type=int, default=1,
+                       help="concurrent problem fetches (requires --fetch-mode http)")
+    group.add_argument("--rpm", type=float, default=None,
+                       help=f"page requests per minute, shared by all workers and browsers "
+                            f"(default {DEFAULT_REQUESTS_PER_MINUTE})")
+    group.add_argument("--browsers", type=int, default=1,
+                       help="scrape with this many Chrome instances in parallel")
+    group.add_argument("--shard-by", choices=["course", "assignment"], default="course",
+                       help="unit of work handed to each browser")
+    group.add_argument("--browser-memory-cap", type=float, default=None, metavar="MB",
+                       help="restart a Chrome instance once it uses more than MB of memory")
+    group.add_argument("--browser-profile", choices=["lean", "full"], default="lean",
+                       help="lean: eager page loads, images/fonts/media/trackers blocked, "
+                            f"persistent profile in {CHROME_PROFILE_DIR}/; full: plain Chrome")
+    group.add_argument("--show-browser", action="store_true", help="run Chrome with a window")
+    group.add_argument("--no-assets", action="store_true",
+                       help="do not download problem images and attachments")
+    group.add_argument("--asset-workers", type=int, default=4,
+                       help="parallel image/attachment downloads")
+    group.add_argument("--listing-ttl", type=float, nargs=3, default=None,
+                       metavar=("COURSES", "ASSIGNMENTS", "PROBLEMS"),
+                       help="hours before course, assignment and problem listings are re-read "
+                            f"(default {' '.join(f'{h:g}' for h in LISTING_TTL_HOURS.values())})")
+    group.add_argument("--max-requests", type=int, default=None, metavar="N",
+                       help="stop after N page requests; new, changed and open assignments go first")
+    group.add_argument("--max-minutes", type=float, default=None, metavar="M",
+                       help="stop scraping after M minutes, most urgent work first")
+    group.add_argument("--resume", action="store_true",
+                       help=f"continue an interrupted scrape from {JOURNAL_FILE}")
+    group.add_argument("--refresh-older-than", type=float, default=None, metavar="HOURS",
+                       help="re-fetch problems fetched more than HOURS ago (default: never)")
+    
+    classify = argparse.ArgumentParser(add_help=False)
+    group = classify.add_argument_group("classification")
+    group.add_argument("--ai-workers", type=int, default=4,
+                       help="classification requests kept in flight")
+    group.add_argument("--ai-rpm", type=float, default=None, help="LLM requests-per-minute limit")
+    group.add_argument("--ai-tpm", type=float, default=None, help="LLM tokens-per-minute limit")
+    group.add_argument("--no-ai-cache", action="store_true",
+                       help=f"always call the LLM instead of reusing {AI_CACHE_FILE}")
+    group.add_argument("--organize-mode", choices=["copy", "link"], default="copy",
+                       help="'link' files organized problems with reflinks/hardlinks instead of copies")
+    group.add_argument("--dedup", type=float, default=None, metavar="SIMILARITY",
+                       help="classify one problem per group of near-duplicates at this similarity (e.g. 0.8)")
+    group.add_argument("--batch-tokens", type=int, default=None,
+                       help="pack several problems per LLM request up to this many tokens")
+    group.add_argument("--local-threshold", type=float, default=None,
+                       help="classify offline when the local model's confidence is at least this")
+    group.add_argument("--stream", action="store_true",
+                       help="stream LLM answers, filing each problem and writing its README as it arrives")
+    
+    upload = argparse.ArgumentParser(add_help=False)
+    group = upload.add_argument_group("upload")
+    group.add_argument("--commit-per-category", action="store_true",
+                       help="upload with one commit per changed category")
+    
+    parser = argparse.ArgumentParser(description="Quera scraper pipeline (default command: all)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    
+    sub.add_parser("scrape", parents=[common, stored, scrape], help=f"scrape Quera into {BASE_DIR}")
+    sub.add_parser("classify", parents=[common, stored, classify],
+                   help=f"classify {BASE_DIR} into {ORGANIZED_DIR}")
+    sub.add_parser("upload", parents=[common, upload], help=f"push {ORGANIZED_DIR} to GitHub")
+    everything = sub.add_parser("all", parents=[common, stored, scrape, classify, upload],
+                                help="scrape, classify and upload")
+    everything.add_argument("--pipeline", action="store_true",
+                            help="classify problems while scraping instead of after it")
+    everything.add_argument("--queue-size", type=int, default=16,
+                            help="problems the scraper may run ahead of the classifier in --pipeline mode")
+    
+    sub.add_parser("import-scraped", parents=[common],
+                   help=f"load problems already in {BASE_DIR} into {PROBLEM_STORE_FILE}")
+    evaluate = sub.add_parser("evaluate-local", parents=[common],
+                              help=f"report local classifier accuracy against the labels in {ORGANIZED_DIR}")
+    evaluate.add_argument("--local-threshold", type=float, default=0.35)
+    
+    search = sub.add_parser("search", help=f"find problems in {SEARCH_INDEX_FILE}")
+    search.add_argument("keywords", nargs="*", help="words in the title, statement or summary (prefixes match)")
+    search.add_argument("--course", help="course id or part of its name")
+    search.add_argument("--assignment", help="assignment id or part of its name")
+    search.add_argument("--category", help="category or part of it, e.g. graph")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--rank-candidates", type=int, default=None, metavar="N",
+                        help="rank only the newest N keyword matches (faster for very common words)")
+    search.add_argument("--json", action="store_true", help="print matches as JSON")
+    sub.add_parser("reindex", parents=[common],
+                   help=f"rebuild {SEARCH_INDEX_FILE} and index.json from {BASE_DIR} and {ORGANIZED_DIR}")
+    return parser
+
+def main(argv: Optional[List[str]] = None):
+    """Complete pipeline: Scrape → Classify → Upload, or a single stage"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["all"] + argv
+    args = _build_parser().parse_args(argv)
+    if args.command == "all" and args.store and args.pipeline:
+        sys.exit("--store and --pipeline cannot be combined")
+    
+    if args.command == "import-scraped":
+        store = ProblemStore(PROBLEM_STORE_FILE)
+        store.import_scraped(BASE_DIR)
+        store.close()
+        return
+    
+    if args.command == "search":
+        _run_search(args)
+        return
+    
+    if args.command == "reindex":
+        search = SearchIndex(SEARCH_INDEX_FILE)
+        search.rebuild(BASE_DIR, ORGANIZED_DIR)
+        search.export_json(os.path.join(ORGANIZED_DIR, "index.json"))
+        search.close()
+        return
+    
+    if args.command == "evaluate-local":
+        texts, labels = LocalClassifier.load_organized(ORGANIZED_DIR)
+        LocalClassifier.evaluate(texts, labels, threshold=args.local_threshold)
+        return
+    
+    store = ProblemStore(PROBLEM_STORE_FILE) if getattr(args, "store", False) else None
+    search = None if getattr(args, "no_search_index", True) else SearchIndex(SEARCH_INDEX_FILE)
+    classifier = _build_classifier(args, search) if args.command in ("classify", "all") else None
+    pipeline = None
+    try:
+        if args.command in ("scrape", "all"):
+            if args.command == "all" and args.pipeline:
+                pipeline = ProblemPipeline(classifier, ORGANIZED_DIR, args.queue_size).start()
+            _run_scrape(args, store, pipeline, search)
+        
+        if classifier and not pipeline:
+            _run_classify(args, classifier, store)
+        
+        if classifier and search:
+            search.export_json(os.path.join(ORGANIZED_DIR, "index.json"))
+        
+        if args.command in ("upload", "all"):
+            _run_upload(args)
+        
+        if args.command == "all":
+            logger.info("\n" + "=" * 70)
+            logger.info("✅ COMPLETE PIPELINE FINISHED!")
+            logger.info("=" * 70)
+    finally:
+        if store:
+            store.close()
+        if search:
+            search.close()
+        if classifier and classifier.cache:
+            classifier.cache.close()
+        METRICS.log_progress(force=True)
+        METRICS.export(args.metrics_prefix)
 
 if __name__ == "__main__":
     main()
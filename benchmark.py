@@ -0,0 +1,518 @@
+# ========================================
+# QUERA SCRAPER - Offline Benchmark
+# Replays Quera pages and a mock LLM locally
+# ========================================
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import itertools
+import statistics
+import subprocess
+import tempfile
+import resource
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Optional
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import QueraScrapper as qs
+
+logger = qs.logger
+
+FIXTURES_DIR = Path(__file__).parent / "benchmarks" / "fixtures"
+
+# Recorded page kinds, matched against the request path in this order
+PAGE_KINDS = [
+    ("assignment", re.compile(r"^/course/assignments/(\d+)/problems/?$")),
+    ("problem", re.compile(r"^/course/assignments/(\d+)/problems/(\d+)")),
+    ("course", re.compile(r"^/course/(\d+)/?$")),
+    ("courses", re.compile(r"^/course/?$")),
+]
+
+# ==================== FAKE QUERA ====================
+
+class FakeQuera:
+    """Serves course, assignment and problem pages.
+
+    Pages come from ``benchmarks/fixtures/<kind>.html`` when recorded (see the
+    ``record`` command), otherwise from small synthetic templates that use the
+    same selectors as ``QueraScraper``.
+    """
+
+    def __init__(self, assignments: int = 5, problems: int = 6, latency: float = 0.0,
+                 rate_limit_rate: float = 0.0, fixtures_dir: Path = FIXTURES_DIR):
+        self.assignments = assignments
+        self.problems = problems
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.fixtures = {kind: (fixtures_dir / f"{kind}.html").read_text(encoding="utf-8")
+                         for kind, _ in PAGE_KINDS if (fixtures_dir / f"{kind}.html").exists()}
+        self.words = [w for d in qs.CATEGORIES.values() for w in d.split()] + ["آرایه", "گراف", "عدد"]
+
+    def page(self, path: str, base_url: str) -> Optional[str]:
+        if path.startswith("/dashboard"):
+            return "<html><body>dashboard</body></html>"
+        for kind, pattern in PAGE_KINDS:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if random.random() < self.rate_limit_rate and kind == "problem":
+                return f"<html><body>{qs.RATE_LIMIT_MARKER}</body></html>"
+            if kind in self.fixtures:
+                return self.fixtures[kind].replace(qs.QueraScraper.BASE_URL, base_url)
+            return getattr(self, f"_{kind}")(*match.groups())
+        return None
+
+    def _courses(self) -> str:
+        links = "".join(f'<a href="/course/{cid}">{name}</a>' for cid, name in TARGET_COURSES.items())
+        return f"<html><body>{links}</body></html>"
+
+    def _course(self, course_id: str) -> str:
+        links = "".join(f'<a href="/course/assignments/{course_id}{i:03d}/problems">تمرین {i}</a>'
+                        for i in range(self.assignments))
+        return f"<html><body><h1>{course_id}</h1>{links}</body></html>"
+
+    def _assignment(self, assignment_id: str) -> str:
+        links = "".join(
+            f'<a data-pid="{assignment_id}{i:02d}" '
+            f'href="/course/assignments/{assignment_id}/problems/{assignment_id}{i:02d}">'
+            f'سوال {assignment_id}-{i}\nامتیاز ۱۰۰</a>'
+            for i in range(self.problems)
+        )
+        return f"<html><body>{links}</body></html>"
+
+    def _problem(self, assignment_id: str, problem_id: str) -> str:
+        rng = random.Random(problem_id)
+        text = " ".join(rng.choice(self.words) for _ in range(400))
+        # Fonts, images and a tracker script like the real pages load (see STATIC_PATHS)
+        return (f'<html><head><link rel="stylesheet" href="/static/site.css">'
+                f'<script src="/googletagmanager.com/gtag.js"></script></head>'
+                f"<body><h1>سوال {problem_id}</h1>"
+                f'<div id="description_md-{problem_id}"><p>{text}</p>'
+                f'<img src="/media/figure{int(problem_id) % 3}.png">'
+                f"<h3>ورودی نمونه ۱</h3><pre>3\n1 2 3</pre>"
+                f"<h3>خروجی نمونه ۱</h3><pre>6</pre></div></body></html>")
+
+# Sub-resources served with a fixed size; blocked by the lean Chrome profile except site.css
+STATIC_PATHS = {
+    "/static/site.css": ("text/css", b"@font-face{font-family:v;src:url(/static/vazir.woff2)}"
+                                     b"body{font-family:v}"),
+    "/static/vazir.woff2": ("font/woff2", b"\0" * 200_000),
+    "/googletagmanager.com/gtag.js": ("text/javascript", b"//" + b"x" * 100_000),
+}
+
+TARGET_COURSES = {
+    "14834": "مبانی برنامه‌سازی-پاییز ۱۴۰۲",
+    "17076": "برنامه سازی پیشرفته",
+    "18934": "ساختمان داده و الگوریتم ها",
+    "23310": "طراحی و تحلیل الگوریتم‌ها",
+}
+
+# ==================== MOCK LLM ====================
+
+class MockLLM:
+    """OpenAI-compatible ``/chat/completions`` stub with latency and errors"""
+
+    def __init__(self, latency: float = 0.5, error_rate: float = 0.0, token_delay: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.token_delay = token_delay
+
+    def complete(self, body: Dict) -> tuple:
+        """Return (status, JSON payload) for a chat completion request"""
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.error_rate:
+            status = random.choice([429, 500, 503])
+            return status, {"error": {"message": "mock failure", "code": status}}
+
+        prompt = body["messages"][-1]["content"]
+        categories = list(qs.CATEGORIES)
+        if "=== PROBLEM <problem id> ===" in prompt:
+            ids = re.findall(r"^### Problem (\S+)$", prompt, re.M)
+            content = "\n".join(
+                f"=== PROBLEM {pid} ===\nCATEGORY: {categories[hash(pid) % len(categories)]}\n\n"
+                f"## English Summary\nSummary of problem {pid}: $\\frac{{n}}{{2}} \\le \\sum a_i$.\n\n"
+                f"## Persian Summary / خلاصه فارسی\nخلاصه مسئله {pid}\n"
+                for pid in ids)
+        else:
+            category = categories[hash(prompt) % len(categories)]
+            content = (f"CATEGORY: {category}\n\n## English Summary\nA mock summary.\n\n"
+                       f"## Persian Summary / خلاصه فارسی\nخلاصه آزمایشی\n")
+
+        prompt_tokens = len(prompt) // 3
+        completion_tokens = len(content) // 3
+        if body.get("stream"):
+            return 200, self._chunks(body, content, prompt_tokens, completion_tokens)
+        return 200, {
+            "id": "mock", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", qs.AI_MODEL),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    @staticmethod
+    def _chunks(body: Dict, content: str, prompt_tokens: int, completion_tokens: int) -> list:
+        """``chat.completion.chunk`` payloads streaming ``content`` a few words at a time"""
+        base = {"id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                "model": body.get("model", qs.AI_MODEL)}
+        pieces = re.findall(r"\S+\s*|\s+", content)
+        chunks = [dict(base, choices=[{"index": 0, "finish_reason": None,
+                                       "delta": {"content": "".join(pieces[i:i + 4])}}])
+                  for i in range(0, len(pieces), 4)]
+        chunks.append(dict(base, choices=[{"index": 0, "finish_reason": "stop", "delta": {}}]))
+        if body.get("stream_options", {}).get("include_usage"):
+            chunks.append(dict(base, choices=[], usage={
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}))
+        return chunks
+
+# ==================== SERVER ====================
+
+def start_server(quera: FakeQuera, llm: MockLLM) -> tuple:
+    """Serve both fakes on a free localhost port, returns (server, base_url)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body, content_type: str):
+            data = body.encode("utf-8") if isinstance(body, str) else body
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            time.sleep(quera.latency)
+            if self.path.startswith("/media/"):
+                self._send(200, self.path.encode("utf-8") * 64, "image/png")
+                return
+            if self.path in STATIC_PATHS:
+                content_type, body = STATIC_PATHS[self.path]
+                self._send(200, body, content_type)
+                return
+            html = quera.page(self.path.split("?")[0], base_url)
+            if html is None:
+                self._send(404, "not found", "text/plain")
+            else:
+                self._send(200, html, "text/html; charset=utf-8")
+
+        def do_POST(self):
+            if not self.path.endswith("/chat/completions"):
+                self._send(404, "not found", "text/plain")
+                return
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            status, payload = llm.complete(body)
+            if isinstance(payload, list):
+                # Server-sent events; the connection closes after the response
+                self.send_response(status)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for chunk in payload + ["[DONE]"]:
+                    data = chunk if isinstance(chunk, str) else json.dumps(chunk, ensure_ascii=False)
+                    self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(llm.token_delay)
+                return
+            self._send(status, json.dumps(payload, ensure_ascii=False), "application/json")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, base_url
+
+# ==================== BENCHMARK ====================
+
+def run_replay(args) -> Dict:
+    """Scrape → classify against the local fakes and report throughput"""
+    quera = FakeQuera(args.assignments, args.problems, args.page_latency, args.rate_limit_rate)
+    llm = MockLLM(args.llm_latency, args.llm_error_rate, args.llm_token_delay)
+    server, base_url = start_server(quera, llm)
+
+    workdir = tempfile.mkdtemp(prefix="quera-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    tracemalloc.start()
+    stages = {}
+    try:
+        qs.METRICS = qs.Metrics()
+        scraper = qs.QueraScraper("bench", "bench", fetch_mode="http", workers=args.workers,
+                                  requests_per_minute=args.rpm)
+        scraper.BASE_URL = base_url
+        scraper.target_courses = dict(TARGET_COURSES)
+
+        start = time.perf_counter()
+        try:
+            scraper.scrape_all_courses(qs.BASE_DIR)
+        finally:
+            scraper.close()
+        stages["scrape"] = time.perf_counter() - start
+
+        classifier = qs.AIClassifier("bench", workers=args.ai_workers, base_url=f"{base_url}/v1",
+                                     batch_tokens=args.batch_tokens, stream=args.stream)
+        start = time.perf_counter()
+        classifier.organize_problems(qs.BASE_DIR, qs.ORGANIZED_DIR)
+        stages["classify"] = time.perf_counter() - start
+
+        _, peak = tracemalloc.get_traced_memory()
+        problems = len(TARGET_COURSES) * args.assignments * args.problems
+        metrics = qs.METRICS.summary()
+        return {
+            "problems": problems,
+            "scrape_problems_per_min": problems / stages["scrape"] * 60,
+            "classify_problems_per_min": problems / stages["classify"] * 60,
+            "end_to_end_problems_per_min": problems / sum(stages.values()) * 60,
+            "stage_seconds": stages,
+            "python_peak_mb": peak / 2**20,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "spans": {name: {k: round(v, 5) for k, v in span.items()}
+                      for name, span in metrics["spans"].items()},
+            "counters": metrics["counters"],
+        }
+    finally:
+        tracemalloc.stop()
+        os.chdir(cwd)
+        server.shutdown()
+
+def run_browser(args) -> Dict:
+    """Load problem pages in Chrome with the full and the lean profile"""
+    quera = FakeQuera(1, args.pages, args.page_latency)
+    server, base_url = start_server(quera, MockLLM(0))
+    urls = [f"{base_url}/course/assignments/1/problems/1{i:02d}" for i in range(args.pages)]
+    report = {}
+    try:
+        for profile in ("full", "lean"):
+            qs.METRICS = qs.Metrics()
+            headless = profile == "lean" or args.full_headless
+            scraper = qs.QueraScraper("bench", "bench", headless=headless, browser_profile=profile,
+                                      profile_dir=tempfile.mkdtemp(prefix="quera-chrome-"))
+            scraper.BASE_URL = base_url
+            times, peak_rss = [], 0.0
+            try:
+                for url in urls:
+                    start = time.perf_counter()
+                    scraper._open(url, needs=scraper.STATEMENT_SELECTOR)
+                    times.append(time.perf_counter() - start)
+                    peak_rss = max(peak_rss, qs.process_tree_rss_mb(scraper.driver.service.process.pid))
+            finally:
+                scraper.close()
+            times.sort()
+            report[profile] = {
+                "headless": headless,
+                "browser_start_seconds": qs.METRICS.summary()["spans"]["browser_start"]["total"],
+                "page_load_mean_seconds": sum(times) / len(times),
+                "page_load_p95_seconds": times[int(0.95 * (len(times) - 1))],
+                "peak_rss_mb": peak_rss,
+            }
+    finally:
+        server.shutdown()
+    return report
+
+# Modules a quick classify/upload start should not load
+HEAVY_MODULES = ("selenium", "openai", "numpy", "requests", "bs4")
+
+STARTUP_PROBES = {
+    "import": "import QueraScrapper",
+    "upload_cli": "import QueraScrapper as qs; qs._build_parser().parse_args(['upload'])",
+    "classifier": "import QueraScrapper as qs; qs.AIClassifier('key', cache=None)",
+    "scraper_http": "import QueraScrapper as qs; qs.QueraScraper('a', 'b', fetch_mode='http')",
+}
+
+def run_startup(args) -> Dict:
+    """Time fresh interpreters importing the scraper and building each stage's objects"""
+    here = str(Path(__file__).parent.resolve())
+    report = {"budget_ms": args.budget_ms, "runs": args.runs, "probes": {}}
+
+    def best_ms(code: str) -> float:
+        times = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], cwd=tempfile.gettempdir(), check=True,
+                           env=dict(os.environ, PYTHONPATH=here))
+            times.append((time.perf_counter() - start) * 1000)
+        return statistics.median(times)
+
+    baseline = best_ms("pass")
+    report["interpreter_ms"] = baseline
+    for name, code in STARTUP_PROBES.items():
+        loaded = subprocess.run(
+            [sys.executable, "-c", f"{code}; import sys; print(' '.join(m for m in {HEAVY_MODULES!r} "
+                                   f"if m in sys.modules))"],
+            cwd=tempfile.gettempdir(), env=dict(os.environ, PYTHONPATH=here),
+            capture_output=True, text=True, check=True).stdout.split()
+        report["probes"][name] = {"ms": best_ms(code) - baseline, "heavy_modules": loaded}
+    report["within_budget"] = report["probes"]["import"]["ms"] <= args.budget_ms
+    return report
+
+# Vocabulary of the synthetic archive, Persian spellings with Arabic letters and digits mixed in
+SEARCH_WORDS = ("graph tree shortest path array string sort binary search dynamic queue stack prime "
+                "گراف درخت كوتاه‌ترين مسیر آرایه رشته مرتب‌سازی جستجو پويا صف پشته عدد اول "
+                "ماشین ۲ ٣ bfs dfs dijkstra knapsack matrix").split()
+
+SEARCH_QUERIES = [
+    {"keywords": "shortest path"},
+    {"keywords": "كوتاه‌ترین مسير"},
+    {"keywords": "گرا"},
+    {"keywords": "dijkstra", "category": "Graph"},
+    {"keywords": "", "course": "Course 7", "assignment": "HW 3"},
+    {"keywords": "knapsack", "course": "12"},
+    {"keywords": "", "category": "sorting"},
+    {"keywords": "مسیر", "category": "گراف"},
+]
+
+# Words in most statements: reported, but outside the budget (see --rank-candidates)
+COMMON_QUERIES = [
+    {"keywords": "عدد"},
+]
+
+def run_search(args) -> Dict:
+    """Build a synthetic search index of ``--problems`` problems and time typical queries"""
+    rng = random.Random(0)
+    categories = list(qs.CATEGORIES)
+    # Zipf-distributed vocabulary; the topic words sit at mid ranks, as technical terms do in prose
+    letters = "abcdefghijklmnopqrstuvwxyzابپتجچحدرزسشصطعفقکگلمنوهی"
+    vocabulary = ["".join(rng.choices(letters, k=rng.randint(3, 9))) for _ in range(args.vocabulary)]
+    for i, word in enumerate(SEARCH_WORDS):
+        vocabulary[40 + i * 70] = word
+    vocabulary[2] = COMMON_QUERIES[0]["keywords"]
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    workdir = tempfile.mkdtemp(prefix="quera-search-")
+    index = qs.SearchIndex(os.path.join(workdir, qs.SEARCH_INDEX_FILE))
+    report = {"problems": args.problems, "budget_ms": args.budget_ms,
+              "rank_candidates": args.rank_candidates}
+    try:
+        start = time.perf_counter()
+        for i in range(args.problems):
+            course, assignment = i % 50, (i // 50) % 20
+            title = " ".join(rng.choices(vocabulary, cum_weights=weights, k=4))
+            statement = f"{title}\n\n" + " ".join(rng.choices(vocabulary, cum_weights=weights, k=args.words))
+            path = os.path.join(workdir, f"{course}_Course {course}", f"{assignment}_HW {assignment}", str(i))
+            index.upsert_problem(str(course), str(assignment), str(i), f"Course {course}",
+                                 f"HW {assignment}", title, path, statement, commit=False)
+            index.set_category(categories[i % len(categories)],
+                               " ".join(rng.choices(vocabulary, cum_weights=weights, k=20)),
+                               key=(str(course), str(assignment), str(i)), commit=False)
+        index.conn.commit()
+        report["build_seconds"] = time.perf_counter() - start
+
+        def p95_ms(query: Dict, rank_candidates: Optional[int]) -> float:
+            times = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                index.search(limit=args.limit, rank_candidates=rank_candidates, **query)
+                times.append((time.perf_counter() - start) * 1000)
+            times.sort()
+            return times[int(0.95 * (len(times) - 1))]
+
+        for section, queries in (("queries", SEARCH_QUERIES), ("common_word_queries", COMMON_QUERIES)):
+            report[section] = {}
+            for query in queries:
+                result = {"matches": len(index.search(limit=args.problems, **query)),
+                          "p95_ms": p95_ms(query, None)}
+                if args.rank_candidates and query["keywords"]:
+                    result["p95_ms_bounded"] = p95_ms(query, args.rank_candidates)
+                report[section][json.dumps(query, ensure_ascii=False)] = result
+        report["max_p95_ms"] = max(q["p95_ms"] for q in report["queries"].values())
+        report["within_budget"] = report["max_p95_ms"] <= args.budget_ms
+    finally:
+        index.close()
+    return report
+
+def record_fixtures(args):
+    """Save one live page of each kind with the saved cookies for later replay"""
+    fetcher = qs.HttpFetcher(args.cookies)
+    base = qs.QueraScraper.BASE_URL
+    course_id = args.course
+    urls = {
+        "courses": f"{base}/course",
+        "course": f"{base}/course/{course_id}",
+        "assignment": f"{base}/course/assignments/{args.assignment}/problems",
+        "problem": f"{base}/course/assignments/{args.assignment}/problems/{args.problem}",
+    }
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    for kind, url in urls.items():
+        html = fetcher.get(url)
+        if html is None:
+            logger.error(f"❌ Not logged in, cannot record {url}")
+            return
+        (FIXTURES_DIR / f"{kind}.html").write_text(html, encoding="utf-8")
+        logger.info(f"💾 Recorded {kind}: {url}")
+        time.sleep(5)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Quera scraper benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    replay = sub.add_parser("replay", help="scrape and classify against local fakes")
+    replay.add_argument("--assignments", type=int, default=5, help="assignments per course")
+    replay.add_argument("--problems", type=int, default=6, help="problems per assignment")
+    replay.add_argument("--page-latency", type=float, default=0.05, help="seconds per page")
+    replay.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="fraction of problem pages answered with the rate-limit page")
+    replay.add_argument("--workers", type=int, default=4)
+    replay.add_argument("--rpm", type=float, default=6000)
+    replay.add_argument("--llm-latency", type=float, default=0.5, help="mean seconds per LLM call")
+    replay.add_argument("--llm-error-rate", type=float, default=0.0)
+    replay.add_argument("--llm-token-delay", type=float, default=0.0,
+                        help="seconds between streamed chunks")
+    replay.add_argument("--stream", action="store_true", help="classify with streamed answers")
+    replay.add_argument("--ai-workers", type=int, default=4)
+    replay.add_argument("--batch-tokens", type=int, default=None)
+    replay.add_argument("--output", default=None, help="also write the report to this JSON file")
+
+    browser = sub.add_parser("browser", help="compare page-load time and RSS of the Chrome profiles")
+    browser.add_argument("--pages", type=int, default=20)
+    browser.add_argument("--page-latency", type=float, default=0.05, help="seconds per request")
+    browser.add_argument("--full-headless", action="store_true",
+                         help="run the full profile headless too (default: windowed, as before)")
+    browser.add_argument("--output", default=None, help="also write the report to this JSON file")
+
+    startup = sub.add_parser("startup", help="import/startup time of the stages without scraping")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--budget-ms", type=float, default=150,
+                         help="fail if importing QueraScrapper takes longer than this")
+    startup.add_argument("--output", default=None, help="also write the report to this JSON file")
+
+    search = sub.add_parser("search", help="query latency of the search index on a synthetic archive")
+    search.add_argument("--problems", type=int, default=50000)
+    search.add_argument("--words", type=int, default=150, help="words per synthetic statement")
+    search.add_argument("--vocabulary", type=int, default=20000, help="distinct words")
+    search.add_argument("--rank-candidates", type=int, default=None,
+                        help="also time keyword queries ranking only the newest N matches")
+    search.add_argument("--runs", type=int, default=50, help="repetitions per query")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--budget-ms", type=float, default=10, help="fail if a query's p95 exceeds this")
+    search.add_argument("--output", default=None, help="also write the report to this JSON file")
+
+    record = sub.add_parser("record", help="record live pages as replay fixtures")
+    record.add_argument("--cookies", default="quera_cookies.pkl")
+    record.add_argument("--course", required=True)
+    record.add_argument("--assignment", required=True)
+    record.add_argument("--problem", required=True)
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record_fixtures(args)
+        return
+
+    runners = {"replay": run_replay, "browser": run_browser, "startup": run_startup,
+               "search": run_search}
+    report = runners[args.command](args)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if report.get("within_budget") is False:
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
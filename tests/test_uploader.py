@@ -0,0 +1,120 @@
+"""GitHubUploader against a local bare repository instead of GitHub"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from QueraScrapper import GitHubUploader
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch, tmp_path):
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", str(tmp_path / "gitconfig"))
+    monkeypatch.setenv("GIT_CONFIG_NOSYSTEM", "1")
+    for role in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{role}_NAME", "Uploader Test")
+        monkeypatch.setenv(f"GIT_{role}_EMAIL", "uploader@example.com")
+
+
+@pytest.fixture
+def remote(tmp_path):
+    path = tmp_path / "remote.git"
+    git(tmp_path, "init", "--bare", "-b", "main", str(path))
+    return path
+
+
+@pytest.fixture
+def organized(tmp_path):
+    root = tmp_path / "organized"
+    for category, problem in (("01_Linear_Data_Structures", "Stack"), ("07_Graph_Algorithms", "Road")):
+        folder = root / category / problem
+        folder.mkdir(parents=True)
+        (folder / "README.md").write_text(f"# {problem}\n", encoding="utf-8")
+        (folder / "statement.txt").write_text("not published\n", encoding="utf-8")
+        (folder / "solution.py").write_text("print(1)\n", encoding="utf-8")
+    return root
+
+
+def uploader(organized, remote, **kwargs):
+    return GitHubUploader(str(organized), "user", "repo", remote_url=str(remote), **kwargs)
+
+
+def remote_files(remote):
+    return sorted(git(remote, "ls-tree", "-r", "--name-only", "main").split())
+
+
+def test_commit_per_category_and_push(organized, remote):
+    uploader(organized, remote, commit_per_category=True).upload()
+
+    subjects = git(remote, "log", "--format=%s", "main").splitlines()
+    assert sorted(subjects) == ["Update 01_Linear_Data_Structures: 1 problems",
+                                "Update 07_Graph_Algorithms: 1 problems",
+                                "Update repository files"]
+    files = remote_files(remote)
+    assert "07_Graph_Algorithms/Road/solution.py" in files
+    assert not any(f.endswith("statement.txt") for f in files)
+
+
+def test_second_upload_fast_forwards_with_deletions(organized, remote):
+    uploader(organized, remote).upload()
+    first = git(remote, "rev-parse", "main").strip()
+
+    shutil.rmtree(organized / "07_Graph_Algorithms" / "Road")
+    (organized / "01_Linear_Data_Structures" / "Stack" / "README.md").write_text("# Stack\n\nnew\n")
+    uploader(organized, remote).upload()
+
+    git(remote, "merge-base", "--is-ancestor", first, "main")
+    files = remote_files(remote)
+    assert not any(f.startswith("07_Graph_Algorithms/") for f in files)
+    assert "new" in git(remote, "show", "main:01_Linear_Data_Structures/Stack/README.md")
+
+
+def test_nothing_to_commit_on_unchanged_tree(organized, remote):
+    uploader(organized, remote).upload()
+    head = git(remote, "rev-parse", "main")
+    uploader(organized, remote).upload()
+    assert git(remote, "rev-parse", "main") == head
+
+
+def test_changed_files_lists_both_sides_of_a_rename(organized, remote):
+    uploader(organized, remote).upload()
+    git(organized, "mv", "07_Graph_Algorithms/Road", "03_Graph_Structures")
+
+    changed = uploader(organized, remote)._changed_files()
+    assert "07_Graph_Algorithms/Road/README.md" in changed
+    assert "03_Graph_Structures/README.md" in changed
+
+
+def test_push_is_never_forced(organized, remote, tmp_path):
+    uploader(organized, remote).upload()
+    other = tmp_path / "other"
+    git(tmp_path, "clone", str(remote), str(other))
+    (other / "index.json").write_text("[]\n")
+    git(other, "add", "index.json")
+    git(other, "commit", "-m", "remote change")
+    git(other, "push", "origin", "main")
+    remote_head = git(remote, "rev-parse", "main")
+
+    (organized / "01_Linear_Data_Structures" / "Stack" / "README.md").write_text("# Stack\n\nlocal\n")
+    with pytest.raises(subprocess.CalledProcessError):
+        uploader(organized, remote).upload()
+    assert git(remote, "rev-parse", "main") == remote_head
+
+
+def test_missing_organized_dir_is_reported(tmp_path, remote, caplog):
+    uploader(tmp_path / "missing", remote).upload()
+
+    assert "does not exist" in caplog.text
+    assert "Git not installed" not in caplog.text
+    assert not (tmp_path / "missing").exists()